@@ -12,6 +12,8 @@ NEO4J_CONFIG = {
 # Connection pool settings
 NEO4J_CONNECTION_POOL = {
     'max_connection_pool_size': 50,
+    'connection_acquisition_timeout': 60,
+    'connection_timeout': 30,
     'max_transaction_retry_time': 30,
     'initial_retry_delay': 1.0,
     'retry_delay_multiplier': 2.0,
@@ -22,5 +24,6 @@ NEO4J_CONNECTION_POOL = {
 BATCH_CONFIG = {
     'batch_size': 1000,
     'max_batch_size': 5000,
+    'workers': 8,  # Concurrent batch writers
     'transaction_timeout': 300  # 5 minutes
 }
\ No newline at end of file
@@ -14,82 +14,204 @@ import pandas as pd
 import numpy as np
 from neo4j import GraphDatabase
 import os
+import csv
 import json
 from datetime import datetime
 import logging
 from collections import defaultdict
+from itertools import islice
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Drug sensitivity columns of the NeST table
+PATHWAY_DRUG_COLUMNS = ['Camptothecin', 'CD437', 'Cisplatin', 'Etoposide', 'Gemcitabine', 'Olaparib']
+
+# Column types for reading the NeST table; integer columns are read as
+# float, truncated like int() and narrowed to nullable Int64 after parsing
+PATHWAY_TABLE_DTYPES = {
+    'NEST ID': str, 'name': str, 'name_new': str, 'All_Genes': str,
+    'Size_All': 'float64', 'name_show': 'float64', 'sum': 'float64',
+    **{drug: 'float64' for drug in PATHWAY_DRUG_COLUMNS}
+}
+
+# Edge file written to the Neo4j import directory for LOAD CSV
+GENE_PATHWAY_EDGES_FILE = 'nest_gene_pathway_edges.csv'
+GENE_PATHWAY_EDGE_COLUMNS = ['gene_symbol', 'nest_id', 'pathway_name']
+
+# Properties written onto PathwayModule nodes
+PATHWAY_MODULE_COLUMNS = [
+    'nest_id', 'pathway_name', 'pathway_description', 'gene_count', 'size_all', 'source',
+    'camptothecin_sensitivity', 'cd437_sensitivity', 'cisplatin_sensitivity',
+    'etoposide_sensitivity', 'gemcitabine_sensitivity', 'olaparib_sensitivity',
+    'is_selected', 'display_priority', 'aggregate_score'
+]
+PATHWAY_MODULE_INT_COLUMNS = ['gene_count', 'display_priority', 'aggregate_score']
+
 class PathwayIntegrationProcessor:
-    def __init__(self, data_dir, neo4j_uri="bolt://localhost:7687", user="neo4j", password="password"):
+    def __init__(self, data_dir, neo4j_uri="bolt://localhost:7687", user="neo4j", password="password", max_workers=8, import_dir=None):
         self.data_dir = data_dir
+        # Neo4j import directory; when set, edges are bulk loaded with LOAD CSV
+        self.import_dir = import_dir
+        self.max_workers = max_workers
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(user, password))
         self.stats = defaultdict(int)
+        # Filled in by the first full pass of parse_pathway_data
+        self.total_pathways = None
+        self.unique_gene_count = None
         
     def close(self):
         self.driver.close()
     
-    def parse_pathway_data(self):
-        """Parse NeST pathway table"""
+    def parse_pathway_data(self, chunksize=50000):
+        """Stream pathway records from the NeST pathway table"""
         logger.info("Parsing NeST pathway table...")
         
         file_path = os.path.join(self.data_dir, 'NeST_table_All.csv')
         
-        # Read the CSV file
-        df = pd.read_csv(file_path)
-        
-        logger.info(f"Parsed {len(df)} pathway modules")
-        logger.info(f"Columns: {df.columns.tolist()}")
+        # Later passes over the same table reuse the first pass' counts
+        count_genes = self.unique_gene_count is None
+        total_pathways = 0
+        unique_genes = set()
         
-        # Process pathway data
-        pathways = []
-        for idx, row in df.iterrows():
-            if pd.notna(row['All_Genes']) and pd.notna(row['name']):
+        # Read the CSV file in chunks so only one chunk is held in memory,
+        # parsing every column into its final type up front
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=PATHWAY_TABLE_DTYPES):
+            chunk = chunk[chunk['All_Genes'].notna() & chunk['name'].notna()].copy()
+            for column in ['NEST ID', 'name', 'name_new']:
+                if column in chunk.columns:
+                    chunk[column] = chunk[column].str.strip()
+            for column in ['Size_All', 'name_show', 'sum']:
+                if column in chunk.columns:
+                    chunk[column] = np.trunc(chunk[column]).astype('Int64')
+            if 'selected' in chunk.columns:
+                chunk['selected'] = chunk['selected'].astype('boolean')
+            
+            # Process pathway data; records already hold native int/float/bool values
+            for row in chunk.to_dict('records'):
                 # Parse gene list
-                genes = [g.strip() for g in str(row['All_Genes']).split(',') if g.strip()]
+                genes = [g.strip() for g in row['All_Genes'].split(',') if g.strip()]
                 
                 pathway_data = {
-                    'nest_id': str(row['NEST ID']).strip(),
-                    'pathway_name': str(row['name']).strip(),
+                    'nest_id': row['NEST ID'],
+                    'pathway_name': row['name'],
                     'genes': genes,
                     'gene_count': len(genes),
                     'size_all': row['Size_All'] if pd.notna(row['Size_All']) else len(genes)
                 }
                 
                 # Add optional fields
-                if 'name_new' in df.columns and pd.notna(row['name_new']):
-                    pathway_data['pathway_description'] = str(row['name_new']).strip()
+                if pd.notna(row.get('name_new')):
+                    pathway_data['pathway_description'] = row['name_new']
                 
                 # Add drug sensitivity data
-                drug_columns = ['Camptothecin', 'CD437', 'Cisplatin', 'Etoposide', 'Gemcitabine', 'Olaparib']
-                for drug in drug_columns:
-                    if drug in df.columns and pd.notna(row[drug]):
-                        pathway_data[f'{drug.lower()}_sensitivity'] = float(row[drug])
+                for drug in PATHWAY_DRUG_COLUMNS:
+                    if pd.notna(row.get(drug)):
+                        pathway_data[f'{drug.lower()}_sensitivity'] = row[drug]
                 
                 # Add metadata fields
-                if 'selected' in df.columns and pd.notna(row['selected']):
-                    pathway_data['is_selected'] = bool(row['selected'])
-                if 'name_show' in df.columns and pd.notna(row['name_show']):
-                    pathway_data['display_priority'] = int(row['name_show'])
-                if 'sum' in df.columns and pd.notna(row['sum']):
-                    pathway_data['aggregate_score'] = int(row['sum'])
+                for column, field in [('selected', 'is_selected'), ('name_show', 'display_priority'),
+                                      ('sum', 'aggregate_score')]:
+                    if pd.notna(row.get(column)):
+                        pathway_data[field] = row[column]
                 
-                pathways.append(pathway_data)
+                total_pathways += 1
+                if count_genes:
+                    unique_genes.update(genes)
+                yield pathway_data
+    
+        logger.info(f"Processed {total_pathways} valid pathways")
+        if count_genes:
+            self.total_pathways = total_pathways
+            self.unique_gene_count = len(unique_genes)
+            logger.info(f"Found {self.unique_gene_count} unique genes across all pathways")
+    
+    @staticmethod
+    def _batches(iterable, batch_size):
+        """Yield lists of up to batch_size items from an iterable"""
+        iterator = iter(iterable)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _write_batches(self, batches, write_batch):
+        """Run write_batch over batches in concurrent write transactions.
         
-        logger.info(f"Processed {len(pathways)} valid pathways")
-        unique_genes = set()
-        for pathway in pathways:
-            unique_genes.update(pathway['genes'])
-        logger.info(f"Found {len(unique_genes)} unique genes across all pathways")
+        At most max_workers transactions are in flight, so batches are still
+        pulled from the iterator lazily. Each worker thread keeps one session
+        for the whole run. Yields (batch, result) as batches commit.
+        """
+        worker = threading.local()
+        sessions = []
+        
+        def run_batch(batch):
+            if not hasattr(worker, 'session'):
+                worker.session = self.driver.session()
+                sessions.append(worker.session)
+            return batch, worker.session.execute_write(write_batch, batch)
         
-        return pathways
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending = set()
+                for batch in batches:
+                    if len(pending) >= self.max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                    pending.add(executor.submit(run_batch, batch))
+                for future in as_completed(pending):
+                    yield future.result()
+        finally:
+            for session in sessions:
+                session.close()
     
-    def create_pathway_modules(self, pathways):
-        """Create PathwayModule nodes in Neo4j"""
-        logger.info("Creating pathway module nodes...")
+    @staticmethod
+    def _pathway_module_records(pathways_batch):
+        """Build PathwayModule property maps for a batch of pathways"""
+        batch_df = pd.DataFrame(pathways_batch).reindex(columns=PATHWAY_MODULE_COLUMNS)
+        batch_df['pathway_description'] = batch_df['pathway_description'].fillna(batch_df['pathway_name'])
+        batch_df['source'] = 'nest_table'
+        # Keep integer properties integral when some rows are missing them
+        batch_df[PATHWAY_MODULE_INT_COLUMNS] = np.trunc(
+            batch_df[PATHWAY_MODULE_INT_COLUMNS].astype('float64')
+        ).astype('Int64')
+        
+        # Missing drug/metadata values become NaN; send them as null
+        batch_df = batch_df.astype(object).where(batch_df.notna(), None)
+        return batch_df.to_dict('records')
+    
+    @staticmethod
+    def _merge_pathway_batch(tx, batch):
+        """Write one batch of pathway modules and their gene memberships"""
+        modules, edges = batch
+        module_result = tx.run("""
+            UNWIND $pathways AS pathway
+            MERGE (pm:PathwayModule {nest_id: pathway.nest_id})
+            SET pm += pathway
+        """, pathways=modules)
+        module_counters = module_result.consume().counters
+        
+        edge_counters = None
+        if edges:
+            edge_result = tx.run("""
+                UNWIND $edges AS edge
+                MERGE (g:Gene {symbol: edge.gene_symbol})
+                MERGE (pm:PathwayModule {nest_id: edge.nest_id})
+                MERGE (g)-[r:MEMBER_OF_PATHWAY]->(pm)
+                SET r.source = "nest_table",
+                    r.pathway_name = edge.pathway_name
+            """, edges=edges)
+            edge_counters = edge_result.consume().counters
+        return module_counters, edge_counters
+    
+    def run_integration(self, pathways):
+        """Create PathwayModule nodes and Gene-Pathway relationships in one pass"""
+        logger.info("Creating pathway modules and gene-pathway relationships...")
         
         with self.driver.session() as session:
             # Create constraint for pathway modules
@@ -98,103 +220,89 @@ class PathwayIntegrationProcessor:
                 FOR (pm:PathwayModule) REQUIRE pm.nest_id IS UNIQUE
             """)
             
-            # Prepare pathway data for batch creation
-            pathway_data = []
-            for pathway in pathways:
-                pathway_record = {
-                    'nest_id': pathway['nest_id'],
-                    'pathway_name': pathway['pathway_name'],
-                    'gene_count': pathway['gene_count'],
-                    'size_all': pathway['size_all'],
-                    'pathway_description': pathway.get('pathway_description', pathway['pathway_name']),
-                    'source': 'nest_table'
-                }
-                
-                # Add drug sensitivity scores
-                drug_columns = ['camptothecin_sensitivity', 'cd437_sensitivity', 'cisplatin_sensitivity', 
-                               'etoposide_sensitivity', 'gemcitabine_sensitivity', 'olaparib_sensitivity']
-                for drug_col in drug_columns:
-                    if drug_col in pathway:
-                        pathway_record[drug_col] = pathway[drug_col]
-                
-                # Add metadata
-                for meta_field in ['is_selected', 'display_priority', 'aggregate_score']:
-                    if meta_field in pathway:
-                        pathway_record[meta_field] = pathway[meta_field]
-                
-                pathway_data.append(pathway_record)
+            merged_genes = set()
+            edge_file = None
+            edge_writer = None
+            if self.import_dir:
+                edge_path = os.path.join(self.import_dir, GENE_PATHWAY_EDGES_FILE)
+                logger.info(f"Writing gene-pathway edges to {edge_path}")
+                edge_file = open(edge_path, 'w', newline='')
+                edge_writer = csv.DictWriter(edge_file, fieldnames=GENE_PATHWAY_EDGE_COLUMNS)
+                edge_writer.writeheader()
             
-            # Create pathway modules in batches
-            batch_size = 100
-            for i in range(0, len(pathway_data), batch_size):
-                batch = pathway_data[i:i + batch_size]
-                
-                result = session.run("""
-                    UNWIND $pathways AS pathway
-                    MERGE (pm:PathwayModule {nest_id: pathway.nest_id})
-                    SET pm.pathway_name = pathway.pathway_name,
-                        pm.pathway_description = pathway.pathway_description,
-                        pm.gene_count = pathway.gene_count,
-                        pm.size_all = pathway.size_all,
-                        pm.source = pathway.source,
-                        pm.camptothecin_sensitivity = pathway.camptothecin_sensitivity,
-                        pm.cd437_sensitivity = pathway.cd437_sensitivity,
-                        pm.cisplatin_sensitivity = pathway.cisplatin_sensitivity,
-                        pm.etoposide_sensitivity = pathway.etoposide_sensitivity,
-                        pm.gemcitabine_sensitivity = pathway.gemcitabine_sensitivity,
-                        pm.olaparib_sensitivity = pathway.olaparib_sensitivity,
-                        pm.is_selected = pathway.is_selected,
-                        pm.display_priority = pathway.display_priority,
-                        pm.aggregate_score = pathway.aggregate_score
-                """, pathways=batch)
-                
-                summary = result.consume()
-                self.stats['pathway_modules_created'] += summary.counters.nodes_created
-                self.stats['pathway_properties_set'] += summary.counters.properties_set
+            def pathway_batches(batch_size=100):
+                """Prepare module records and edges one batch of pathways at a time"""
+                for pathways_batch in self._batches(pathways, batch_size):
+                    # One edge row per (gene, pathway) pair
+                    edges_df = (
+                        pd.DataFrame(pathways_batch, columns=['nest_id', 'pathway_name', 'genes'])
+                        .explode('genes')
+                        .dropna(subset=['genes'])
+                        .rename(columns={'genes': 'gene_symbol'})
+                    )
+                    edges = edges_df[GENE_PATHWAY_EDGE_COLUMNS].to_dict('records')
+                    self.stats['genes_processed'] += len(edges)
+                    
+                    if edge_writer:
+                        # Edges are bulk loaded with LOAD CSV once modules exist
+                        edge_writer.writerows(edges)
+                        edges = []
+                    else:
+                        # Gene.symbol has no uniqueness constraint, so concurrent
+                        # MERGEs of a new gene could duplicate it; create them here
+                        new_genes = {edge['gene_symbol'] for edge in edges} - merged_genes
+                        if new_genes:
+                            session.run("""
+                                UNWIND $symbols AS symbol
+                                MERGE (:Gene {symbol: symbol})
+                            """, symbols=list(new_genes)).consume()
+                            merged_genes.update(new_genes)
+                    
+                    yield self._pathway_module_records(pathways_batch), edges
+            
+            # Each batch commits its modules and edges in one transaction;
+            # nest_id is unique-constrained so batches can run concurrently
+            try:
+                module_count = 0
+                batches = self._write_batches(pathway_batches(), self._merge_pathway_batch)
+                for batch_num, ((modules, edges), (module_counters, edge_counters)) in enumerate(batches, 1):
+                    self.stats['pathway_modules_created'] += module_counters.nodes_created
+                    self.stats['pathway_properties_set'] += module_counters.properties_set
+                    if edge_counters:
+                        self.stats['gene_pathway_relationships_created'] += edge_counters.relationships_created
+                    module_count += len(modules)
+                    
+                    if batch_num % 5 == 0:
+                        logger.info(f"Processed batch {batch_num} ({module_count} pathways)")
+            finally:
+                if edge_file:
+                    edge_file.close()
+            
+            logger.info(f"Created {module_count} pathway modules")
+            
+            if self.import_dir:
+                self._load_gene_pathway_relationships_csv(session)
         
-        logger.info(f"Created {len(pathways)} pathway modules")
+        logger.info(f"Created {self.stats['gene_pathway_relationships_created']} gene-pathway relationships")
         return self.stats
     
-    def create_gene_pathway_relationships(self, pathways):
-        """Create Gene-Pathway relationships"""
-        logger.info("Creating gene-pathway relationships...")
-        
-        # Prepare gene-pathway data
-        gene_pathway_data = []
-        for pathway in pathways:
-            for gene_symbol in pathway['genes']:
-                gene_pathway_data.append({
-                    'gene_symbol': gene_symbol,
-                    'nest_id': pathway['nest_id'],
-                    'pathway_name': pathway['pathway_name']
-                })
-        
-        logger.info(f"Preparing {len(gene_pathway_data)} gene-pathway relationships")
+    def _load_gene_pathway_relationships_csv(self, session):
+        """Bulk load Gene-Pathway relationships server-side with LOAD CSV"""
+        # CALL ... IN TRANSACTIONS needs an auto-commit transaction, so use session.run
+        result = session.run("""
+            LOAD CSV WITH HEADERS FROM 'file:///' + $file_name AS edge
+            CALL {
+                WITH edge
+                MERGE (g:Gene {symbol: edge.gene_symbol})
+                MERGE (pm:PathwayModule {nest_id: edge.nest_id})
+                MERGE (g)-[r:MEMBER_OF_PATHWAY]->(pm)
+                SET r.source = "nest_table",
+                    r.pathway_name = edge.pathway_name
+            } IN TRANSACTIONS OF 5000 ROWS
+        """, file_name=GENE_PATHWAY_EDGES_FILE)
         
-        with self.driver.session() as session:
-            # Process in batches
-            batch_size = 1000
-            for i in range(0, len(gene_pathway_data), batch_size):
-                batch = gene_pathway_data[i:i + batch_size]
-                
-                result = session.run("""
-                    UNWIND $edges AS edge
-                    MERGE (g:Gene {symbol: edge.gene_symbol})
-                    MERGE (pm:PathwayModule {nest_id: edge.nest_id})
-                    MERGE (g)-[r:MEMBER_OF_PATHWAY]->(pm)
-                    SET r.source = "nest_table",
-                        r.pathway_name = edge.pathway_name
-                """, edges=batch)
-                
-                summary = result.consume()
-                self.stats['gene_pathway_relationships_created'] += summary.counters.relationships_created
-                self.stats['genes_processed'] += len(batch)
-                
-                if (i // batch_size + 1) % 5 == 0:
-                    logger.info(f"Processed batch {i//batch_size + 1}/{(len(gene_pathway_data)-1)//batch_size + 1}")
-        
-        logger.info(f"Created {self.stats['gene_pathway_relationships_created']} gene-pathway relationships")
-        return self.stats
+        summary = result.consume()
+        self.stats['gene_pathway_relationships_created'] += summary.counters.relationships_created
     
     def validate_integration(self):
         """Validate the pathway integration"""
@@ -293,6 +401,7 @@ def main():
 
     parser = argparse.ArgumentParser(description='Pathway Integration Script')
     parser.add_argument('--data-dir', required=True, help='Path to data directory')
+    parser.add_argument('--import-dir', help='Neo4j import directory; bulk load gene-pathway edges with LOAD CSV')
     args = parser.parse_args()
 
     logger.info("=== Starting Phase 4c: Semantic Pathway Integration ===")
@@ -301,20 +410,12 @@ def main():
     pathway_data_dir = f"{args.data_dir}/llm_evaluation_for_gene_set_interpretation/data"
     
     # Initialize processor
-    processor = PathwayIntegrationProcessor(pathway_data_dir)
+    processor = PathwayIntegrationProcessor(pathway_data_dir, import_dir=args.import_dir)
     
     try:
-        # Step 1: Parse pathway data
-        logger.info("Step 1: Parsing pathway data...")
-        pathways = processor.parse_pathway_data()
-        
-        # Step 2: Create pathway modules
-        logger.info("Step 2: Creating pathway modules...")
-        module_stats = processor.create_pathway_modules(pathways)
-        
-        # Step 3: Create gene-pathway relationships
-        logger.info("Step 3: Creating gene-pathway relationships...")
-        relationship_stats = processor.create_gene_pathway_relationships(pathways)
+        # Steps 1-3: Stream parsed pathways into pathway modules and gene-pathway relationships
+        logger.info("Steps 1-3: Parsing pathway data and creating pathway modules and relationships...")
+        integration_stats = processor.run_integration(processor.parse_pathway_data())
         
         # Step 4: Validate integration
         logger.info("Step 4: Validating integration...")
@@ -331,8 +432,8 @@ def main():
                 'pathway_file': 'NeST_table_All.csv'
             },
             'parsing_stats': {
-                'total_pathways': len(pathways),
-                'unique_genes': len(set(gene for pathway in pathways for gene in pathway['genes']))
+                'total_pathways': processor.total_pathways,
+                'unique_genes': processor.unique_gene_count
             },
             'integration_stats': processor.stats,
             'validation_results': validation_results
@@ -12,20 +12,84 @@ This script processes viral infection edges and expression matrix to create:
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from neo4j import GraphDatabase
 import os
+import re
 import json
 from datetime import datetime
 import logging
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Viral edges file layout and the dtypes of the columns the integration reads
+VIRAL_EDGE_COLUMNS = ['gene_symbol', 'source_desc', 'gene_id', 'viral_condition_full', 'viral_condition', 'study_id', 'weight']
+VIRAL_EDGE_USECOLS = ['gene_symbol', 'gene_id', 'viral_condition_full', 'viral_condition', 'study_id', 'weight']
+VIRAL_EDGE_DTYPES = {
+    'gene_symbol': 'category',
+    'gene_id': 'Int32',
+    'viral_condition_full': str,
+    'viral_condition': str,
+    'study_id': 'category',
+    # float64 so weights reach Neo4j exactly as written in the file
+    'weight': 'float64'
+}
+
+# Integrated edges persisted after Step 2 so --resume-from can skip parsing and integration
+INTEGRATED_PARQUET_FILE = 'phase3_integrated.parquet'
+
+def _any_of(*tokens):
+    """Regex alternation matching any of the literal tokens"""
+    return '(?:' + '|'.join(re.escape(token) for token in tokens) + ')'
+
+# SARS variants are only recognised inside a SARS condition string
+_SARS = '^(?=.*' + _any_of('SARS-CoV', 'icSARS', 'cSARS') + ')'
+
+# Virus name rules in precedence order; the first matching pattern wins
+VIRUS_NAME_RULES = [(re.compile(pattern), virus_name) for pattern, virus_name in [
+    (_any_of('HCMV'), 'Human Cytomegalovirus (HCMV)'),
+    (_SARS + '.*' + _any_of('SARS-BatSRBD'), 'SARS-CoV Bat SRBD'),
+    (_SARS + '.*' + _any_of('MA15'), 'SARS-CoV MA15'),
+    (_SARS + '.*' + _any_of('NSP16'), 'SARS-CoV NSP16'),
+    (_SARS + '.*' + _any_of('icSARS'), 'icSARS-CoV'),
+    (_SARS + '.*' + _any_of('cSARS'), 'cSARS Bat SRBD'),
+    (_SARS, 'SARS-CoV'),
+    (_any_of('A-CA-04-2009', 'A_CA_04_2009'), 'Influenza A H1N1 (CA/04/2009)'),
+    (_any_of('A-Vietnam-1203'), 'Influenza A H5N1 (Vietnam/1203/2004)'),
+    (_any_of('A-Netherlands-602'), 'Influenza A H1N1 (Netherlands/602/2009)'),
+    (_any_of('PR8(H1N1)'), 'Influenza A H1N1 (PR8)'),
+    (_any_of('VN(H5N1)'), 'Influenza A H5N1 (VN)'),
+    (_any_of('X31(H3N2)'), 'Influenza A H3N2 (X31)'),
+    (_any_of('RSV'), 'Respiratory Syncytial Virus (RSV)'),
+    (_any_of('Rabies'), 'Rabies Virus (CVS-11)'),
+    (_any_of('Ebolavirus', 'EBOV', 'ZEBOV'), 'Ebola Virus'),
+    (_any_of('HCV'), 'Hepatitis C Virus (HCV)'),
+    (_any_of('HCoV-EMC2012'), 'MERS Coronavirus (HCoV-EMC)'),
+    (_any_of('HIV'), 'Human Immunodeficiency Virus (HIV)'),
+    (_any_of('HHV'), 'Human Herpesvirus 8 (HHV-8)'),
+    (_any_of('CVB3'), 'Coxsackievirus B3 (CVB3)'),
+    (_any_of('Enterovirus 71'), 'Enterovirus 71'),
+    (_any_of('Lassa', 'LASV'), 'Lassa Fever Virus'),
+    (_any_of('Dhori'), 'Dhori Virus'),
+    (_any_of('hMPV'), 'Human Metapneumovirus (hMPV)'),
+    (_any_of('HEV'), 'Hepatitis E Virus (HEV)'),
+    (_any_of('Measles'), 'Measles Virus'),
+    (_any_of('Epstein-Barr'), 'Epstein-Barr Virus (EBV)'),
+    (_any_of('Norwalk'), 'Norwalk Virus'),
+    (_any_of('RV16'), 'Human Rhinovirus 16 (RV16)'),
+]]
+
 class ViralIntegrationProcessor:
-    def __init__(self, data_dir, neo4j_uri="bolt://localhost:7687", user="neo4j", password="password"):
+    def __init__(self, data_dir, neo4j_uri="bolt://localhost:7687", user="neo4j", password="password", batch_size=20000, max_workers=4):
         self.data_dir = data_dir
+        self.batch_size = batch_size
+        self.max_workers = max_workers
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(user, password))
         self.stats = defaultdict(int)
         
@@ -38,11 +102,10 @@ class ViralIntegrationProcessor:
         
         file_path = os.path.join(self.data_dir, 'Viral_Infections__gene_attribute_edges.txt')
         
-        # Read with proper header handling (skip GeneSym header row)
-        df = pd.read_csv(file_path, sep='\t', skiprows=1, low_memory=False)
-        
-        # Rename columns to match expected structure
-        df.columns = ['gene_symbol', 'source_desc', 'gene_id', 'viral_condition_full', 'viral_condition', 'study_id', 'weight']
+        # Skip both header rows (column names and GeneSym) and parse only the columns used
+        # downstream, straight into compact dtypes
+        df = pd.read_csv(file_path, sep='\t', skiprows=2, header=None,
+                         names=VIRAL_EDGE_COLUMNS, usecols=VIRAL_EDGE_USECOLS, dtype=VIRAL_EDGE_DTYPES)
         
         logger.info(f"Parsed {len(df)} viral gene-virus edges")
         logger.info(f"Found {df['gene_symbol'].nunique()} unique genes")
@@ -50,92 +113,88 @@ class ViralIntegrationProcessor:
         
         return df
     
-    def parse_viral_matrix(self):
-        """Parse viral expression matrix with corrected header handling"""
+    def parse_viral_matrix(self, conditions=None):
+        """Parse viral expression matrix with corrected header handling.
+        
+        The parsed matrix is cached as Parquet next to the source file and reused
+        while it is newer than the source. If conditions is given, only those
+        columns are kept.
+        """
         logger.info("Parsing viral expression matrix...")
         
         file_path = os.path.join(self.data_dir, 'Viral_Infections_gene_attribute_matrix_standardized.txt')
-        
-        # Read with proper header handling - use line 1 as header, skip line 2, use line 3 as index
-        df = pd.read_csv(file_path, sep='\t', header=0, skiprows=[1], index_col=0, low_memory=False)
-        
-        # Drop metadata columns (first two columns after gene symbol)
-        df = df.iloc[:, 2:]
-        
-        # Remove the GeneSym row that got included as data
-        if 'GeneSym' in df.index:
-            df = df.drop('GeneSym')
+        cache_path = os.path.splitext(file_path)[0] + '.parquet'
+        
+        if (os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path)
+                and self._is_float64_matrix_cache(cache_path)):
+            logger.info(f"Loading cached expression matrix from {cache_path}")
+            columns = None
+            if conditions is not None:
+                cached_columns = set(pq.read_schema(cache_path).names)
+                columns = [c for c in conditions if c in cached_columns]
+            df = pd.read_parquet(cache_path, columns=columns)
+        else:
+            # Take condition names from the header line, then let PyArrow parse the body
+            # with the gene symbol as text and every condition typed float64 up front,
+            # so expression weights reach Neo4j exactly as written in the file
+            with open(file_path) as f:
+                header = f.readline().rstrip('\r\n').split('\t')
+            condition_columns = header[3:]
+            table = pa_csv.read_csv(
+                file_path,
+                read_options=pa_csv.ReadOptions(skip_rows=2, column_names=['gene_symbol', 'na', 'gene_id'] + condition_columns),
+                parse_options=pa_csv.ParseOptions(delimiter='\t'),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=['gene_symbol'] + condition_columns,
+                    column_types={'gene_symbol': pa.string(), **{c: pa.float64() for c in condition_columns}},
+                    null_values=['', 'na', 'NA', 'NaN', 'nan', 'N/A']
+                )
+            )
+            df = table.to_pandas().set_index('gene_symbol')
+            
+            # Remove the GeneSym row that follows the header lines
+            if 'GeneSym' in df.index:
+                df = df.drop('GeneSym')
+            
+            try:
+                df.to_parquet(cache_path, compression='zstd')
+            except OSError as e:
+                logger.warning(f"Could not cache expression matrix to {cache_path}: {e}")
+            
+            if conditions is not None:
+                df = df[[c for c in conditions if c in df.columns]]
         
         logger.info(f"Parsed expression matrix: {df.shape[0]} genes × {df.shape[1]} viral conditions")
         
         return df
     
+    @staticmethod
+    def _is_float64_matrix_cache(cache_path):
+        """Whether a cached matrix holds float64 conditions; older caches were float32"""
+        schema = pq.read_schema(cache_path)
+        return all(field.type == pa.float64() for field in schema if field.name != 'gene_symbol')
+    
     def standardize_viral_name(self, viral_condition):
         """Extract standardized virus name from condition string"""
-        # Extract virus name from complex condition strings
-        if 'HCMV' in viral_condition:
-            return 'Human Cytomegalovirus (HCMV)'
-        elif 'SARS-CoV' in viral_condition or 'icSARS' in viral_condition or 'cSARS' in viral_condition:
-            if 'SARS-BatSRBD' in viral_condition:
-                return 'SARS-CoV Bat SRBD'
-            elif 'MA15' in viral_condition:
-                return 'SARS-CoV MA15'
-            elif 'NSP16' in viral_condition:
-                return 'SARS-CoV NSP16'
-            elif 'icSARS' in viral_condition:
-                return 'icSARS-CoV'
-            elif 'cSARS' in viral_condition:
-                return 'cSARS Bat SRBD'
-            else:
-                return 'SARS-CoV'
-        elif 'A-CA-04-2009' in viral_condition or 'A_CA_04_2009' in viral_condition:
-            return 'Influenza A H1N1 (CA/04/2009)'
-        elif 'A-Vietnam-1203' in viral_condition:
-            return 'Influenza A H5N1 (Vietnam/1203/2004)'
-        elif 'A-Netherlands-602' in viral_condition:
-            return 'Influenza A H1N1 (Netherlands/602/2009)'
-        elif 'PR8(H1N1)' in viral_condition:
-            return 'Influenza A H1N1 (PR8)'
-        elif 'VN(H5N1)' in viral_condition:
-            return 'Influenza A H5N1 (VN)'
-        elif 'X31(H3N2)' in viral_condition:
-            return 'Influenza A H3N2 (X31)'
-        elif 'RSV' in viral_condition:
-            return 'Respiratory Syncytial Virus (RSV)'
-        elif 'Rabies' in viral_condition:
-            return 'Rabies Virus (CVS-11)'
-        elif 'Ebolavirus' in viral_condition or 'EBOV' in viral_condition or 'ZEBOV' in viral_condition:
-            return 'Ebola Virus'
-        elif 'HCV' in viral_condition:
-            return 'Hepatitis C Virus (HCV)'
-        elif 'HCoV-EMC2012' in viral_condition:
-            return 'MERS Coronavirus (HCoV-EMC)'
-        elif 'HIV' in viral_condition:
-            return 'Human Immunodeficiency Virus (HIV)'
-        elif 'HHV' in viral_condition:
-            return 'Human Herpesvirus 8 (HHV-8)'
-        elif 'CVB3' in viral_condition:
-            return 'Coxsackievirus B3 (CVB3)'
-        elif 'Enterovirus 71' in viral_condition:
-            return 'Enterovirus 71'
-        elif 'Lassa' in viral_condition or 'LASV' in viral_condition:
-            return 'Lassa Fever Virus'
-        elif 'Dhori' in viral_condition:
-            return 'Dhori Virus'
-        elif 'hMPV' in viral_condition:
-            return 'Human Metapneumovirus (hMPV)'
-        elif 'HEV' in viral_condition:
-            return 'Hepatitis E Virus (HEV)'
-        elif 'Measles' in viral_condition:
-            return 'Measles Virus'
-        elif 'Epstein-Barr' in viral_condition:
-            return 'Epstein-Barr Virus (EBV)'
-        elif 'Norwalk' in viral_condition:
-            return 'Norwalk Virus'
-        elif 'RV16' in viral_condition:
-            return 'Human Rhinovirus 16 (RV16)'
-        else:
-            return viral_condition.split('_')[0]  # Fallback to first part
+        # Extract virus name from complex condition strings; first matching rule wins
+        for pattern, virus_name in VIRUS_NAME_RULES:
+            if pattern.search(viral_condition):
+                return virus_name
+        return viral_condition.split('_')[0]  # Fallback to first part
+    
+    def standardize_viral_names(self, viral_conditions):
+        """Vectorized standardize_viral_name over a Series of condition strings"""
+        virus_names = viral_conditions.str.split('_').str[0]
+        # Walk the ladder once; each rule only scans the rows no earlier rule claimed
+        unmatched = viral_conditions.notna().to_numpy(copy=True)
+        for pattern, virus_name in VIRUS_NAME_RULES:
+            if not unmatched.any():
+                break
+            hits = viral_conditions[unmatched].str.contains(pattern).to_numpy()
+            rows = np.flatnonzero(unmatched)[hits]
+            virus_names.iloc[rows] = virus_name
+            unmatched[rows] = False
+        return virus_names
     
     def integrate_viral_data(self, edges_df, matrix_df):
         """Integrate viral edges with quantitative expression data"""
@@ -145,124 +204,171 @@ class ViralIntegrationProcessor:
         available_conditions = set(matrix_df.columns)
         logger.info(f"Matrix contains {len(available_conditions)} viral conditions")
         
-        integrated_data = []
-        genes_with_expression = set()
-        conditions_matched = set()
-        
-        for _, edge in edges_df.iterrows():
-            gene_symbol = edge['gene_symbol']
-            viral_condition_full = edge['viral_condition_full']
-            
-            # Get expression weight from matrix using direct column matching
-            expression_weight = None
-            if viral_condition_full in available_conditions:
-                if gene_symbol in matrix_df.index:
-                    expression_weight = matrix_df.loc[gene_symbol, viral_condition_full]
-                    genes_with_expression.add(gene_symbol)
-                    conditions_matched.add(viral_condition_full)
-            
-            integrated_data.append({
-                'gene_symbol': gene_symbol,
-                'gene_id': edge['gene_id'],
-                'viral_condition_full': viral_condition_full,
-                'viral_condition': edge['viral_condition'],
-                'virus_name': self.standardize_viral_name(viral_condition_full),
-                'study_id': edge['study_id'],
-                'edge_weight': edge['weight'],
-                'expression_weight': expression_weight
-            })
-        
-        logger.info(f"Integrated {len(integrated_data)} gene-virus relationships")
-        logger.info(f"Matched {len(conditions_matched)} conditions directly")
-        logger.info(f"Expression data available for {len(genes_with_expression)} genes "
-                   f"({len(genes_with_expression)/edges_df['gene_symbol'].nunique()*100:.1f}%)")
-        
-        return integrated_data
+        integrated_df = edges_df[['gene_symbol', 'gene_id', 'viral_condition_full', 'viral_condition', 'study_id', 'weight']]
+        integrated_df = integrated_df.rename(columns={'weight': 'edge_weight'})
+        
+        # Project the matrix down to the genes and conditions the edges reference, then
+        # gather expression weights with integer (row, column) positions into it
+        matrix_df = matrix_df[~matrix_df.index.duplicated()]
+        matrix_df = matrix_df.loc[
+            matrix_df.index.isin(integrated_df['gene_symbol'].unique()),
+            matrix_df.columns.isin(integrated_df['viral_condition_full'].unique())
+        ]
+        matrix_values = matrix_df.to_numpy(dtype=np.float64)
+        gene_idx = matrix_df.index.get_indexer(integrated_df['gene_symbol'])
+        cond_idx = matrix_df.columns.get_indexer(integrated_df['viral_condition_full'])
+        valid = (gene_idx >= 0) & (cond_idx >= 0)
+        expression = np.full(len(integrated_df), np.nan)
+        expression[valid] = matrix_values[gene_idx[valid], cond_idx[valid]]
+        integrated_df['expression_weight'] = expression
+        # Classify each distinct condition once; edges repeat conditions across genes and studies
+        conditions = pd.Series(integrated_df['viral_condition_full'].unique())
+        virus_names = dict(zip(conditions, self.standardize_viral_names(conditions)))
+        integrated_df['virus_name'] = integrated_df['viral_condition_full'].map(virus_names)
+        
+        matched = integrated_df[integrated_df['expression_weight'].notna()]
+        genes_with_expression = matched['gene_symbol'].nunique()
+        
+        logger.info(f"Integrated {len(integrated_df)} gene-virus relationships")
+        logger.info(f"Matched {matched['viral_condition_full'].nunique()} conditions directly")
+        logger.info(f"Expression data available for {genes_with_expression} genes "
+                   f"({genes_with_expression/edges_df['gene_symbol'].nunique()*100:.1f}%)")
+        
+        return integrated_df
+    
+    
+    @staticmethod
+    def _merge_viral_edges(tx, batch):
+        # Virus nodes are merged before any batch is loaded, so a MATCH index seek suffices
+        result = tx.run("""
+            UNWIND $edges AS edge
+            MERGE (g:Gene {symbol: edge.gene_symbol})
+            ON CREATE SET g.entrez_id = edge.gene_id
+            WITH g, edge
+            MATCH (v:Virus {name: edge.virus_name})
+            MERGE (g)-[r:INFECTED_BY]->(v)
+            SET r.edge_weight = edge.edge_weight,
+                r.expression_weight = edge.expression_weight,
+                r.has_expression = edge.has_expression,
+                r.viral_condition = edge.viral_condition,
+                r.viral_condition_full = edge.viral_condition_full,
+                r.study_id = edge.study_id,
+                r.source = "omics"
+        """, edges=batch)
+        return result.consume().counters
     
+    @staticmethod
+    def _merge_viral_genes(tx, genes):
+        result = tx.run("""
+            UNWIND $genes AS gene
+            MERGE (g:Gene {symbol: gene.symbol})
+            ON CREATE SET g.entrez_id = gene.entrez_id
+        """, genes=genes)
+        return result.consume().counters
+    
+    @staticmethod
+    def _edge_batches(edges_df, batch_size):
+        """Yield relationship payload batches from a columnar Arrow view of the integrated frame"""
+        payload = pd.DataFrame({
+            'gene_symbol': edges_df['gene_symbol'],
+            'gene_id': edges_df['gene_id'].astype(str),
+            'virus_name': edges_df['virus_name'],
+            'viral_condition': edges_df['viral_condition'],
+            'viral_condition_full': edges_df['viral_condition_full'],
+            'study_id': edges_df['study_id'].astype(str),
+            'edge_weight': edges_df['edge_weight'].astype(np.float64),
+            'expression_weight': edges_df['expression_weight'],
+            'has_expression': edges_df['expression_weight'].notna()
+        })
+        # NaN expression weights become Arrow nulls, which to_pylist sends as None
+        table = pa.Table.from_pandas(payload, preserve_index=False)
+        for record_batch in table.to_batches(max_chunksize=batch_size):
+            yield record_batch.to_pylist()
+    
+    def _write_edge_partition(self, edges_df):
+        """Write one virus partition of edges serially on its own session.
+        
+        Partitions share Gene nodes, so each batch is a managed write
+        transaction that the driver retries on deadlocks and other transient
+        errors; a failed batch rolls back whole instead of half-committing.
+        """
+        batch_counters = []
+        with self.driver.session() as session:
+            for batch in self._edge_batches(edges_df, self.batch_size):
+                batch_counters.append(session.execute_write(self._merge_viral_edges, batch))
+                logger.info(f"Processed batch of {len(batch)} relationships")
+        return batch_counters
     
-    def create_viral_relationships(self, integrated_data):
+    def create_viral_relationships(self, integrated_df):
         """Create viral nodes and gene-virus relationships in Neo4j"""
         logger.info("Creating viral relationships in Neo4j...")
         
-        # Prepare data for batch processing
-        batch_data = []
-        virus_metadata = {}
-        
-        for data in integrated_data:
-            # Collect virus metadata
-            virus_name = data['virus_name']
-            if virus_name not in virus_metadata:
-                virus_metadata[virus_name] = {
-                    'conditions': set(),
-                    'studies': set()
-                }
-            
-            virus_metadata[virus_name]['conditions'].add(data['viral_condition_full'])
-            virus_metadata[virus_name]['studies'].add(str(data['study_id']))
-            
-            # Prepare relationship data
-            batch_data.append({
-                'gene_symbol': data['gene_symbol'],
-                'gene_id': str(data['gene_id']),
-                'virus_name': virus_name,
-                'viral_condition': data['viral_condition'],
-                'viral_condition_full': data['viral_condition_full'],
-                'study_id': str(data['study_id']),
-                'edge_weight': float(data['edge_weight']),
-                'expression_weight': float(data['expression_weight']) if data['expression_weight'] is not None else None,
-                'has_expression': data['expression_weight'] is not None
-            })
-        
-        # Convert sets to lists for JSON serialization
-        for virus_name in virus_metadata:
-            virus_metadata[virus_name]['conditions'] = list(virus_metadata[virus_name]['conditions'])
-            virus_metadata[virus_name]['studies'] = list(virus_metadata[virus_name]['studies'])
-            virus_metadata[virus_name]['condition_count'] = len(virus_metadata[virus_name]['conditions'])
-            virus_metadata[virus_name]['study_count'] = len(virus_metadata[virus_name]['studies'])
+        # Collect virus metadata
+        virus_metadata_df = (
+            integrated_df.assign(study_id=integrated_df['study_id'].astype(str))
+            .groupby('virus_name', sort=False)
+            .agg(conditions=('viral_condition_full', 'unique'), studies=('study_id', 'unique'))
+        )
+        virus_metadata = {
+            virus_name: {
+                'conditions': list(row.conditions),
+                'studies': list(row.studies),
+                'condition_count': len(row.conditions),
+                'study_count': len(row.studies)
+            }
+            for virus_name, row in zip(virus_metadata_df.index, virus_metadata_df.itertuples(index=False))
+        }
         
-        logger.info(f"Processing {len(batch_data)} relationships for {len(virus_metadata)} viruses")
+        logger.info(f"Processing {len(integrated_df)} relationships for {len(virus_metadata)} viruses")
         
         # Create nodes and relationships in batches
         with self.driver.session() as session:
-            # Create virus nodes with metadata
-            for virus_name, metadata in virus_metadata.items():
-                session.run("""
-                    MERGE (v:Virus {name: $virus_name})
-                    SET v.condition_count = $condition_count,
-                        v.study_count = $study_count,
-                        v.conditions = $conditions,
-                        v.studies = $studies,
-                        v.source = "omics_viral"
-                """, virus_name=virus_name, **metadata)
+            # Make sure both MERGE keys are index-backed before loading. Gene.symbol
+            # gets the builder's plain index: the graph may already hold duplicate
+            # symbols, which would make a uniqueness constraint fail to create
+            session.run("""
+                CREATE INDEX gene_symbol_idx IF NOT EXISTS 
+                FOR (g:Gene) ON (g.symbol)
+            """)
+            session.run("""
+                CREATE CONSTRAINT virus_name_unique IF NOT EXISTS 
+                FOR (v:Virus) REQUIRE v.name IS UNIQUE
+            """)
+            
+            # Create virus nodes with metadata in one round-trip
+            virus_rows = [{'name': virus_name, **metadata} for virus_name, metadata in virus_metadata.items()]
+            session.run("""
+                UNWIND $rows AS row
+                MERGE (v:Virus {name: row.name})
+                SET v.condition_count = row.condition_count,
+                    v.study_count = row.study_count,
+                    v.conditions = row.conditions,
+                    v.studies = row.studies,
+                    v.source = "omics_viral"
+            """, rows=virus_rows)
             
-            # Process relationships in batches of 1000
-            batch_size = 1000
-            for i in range(0, len(batch_data), batch_size):
-                batch = batch_data[i:i + batch_size]
-                
-                result = session.run("""
-                    UNWIND $edges AS edge
-                    MERGE (g:Gene {symbol: edge.gene_symbol})
-                    ON CREATE SET g.entrez_id = edge.gene_id
-                    MERGE (v:Virus {name: edge.virus_name})
-                    MERGE (g)-[r:INFECTED_BY]->(v)
-                    SET r.edge_weight = edge.edge_weight,
-                        r.expression_weight = edge.expression_weight,
-                        r.has_expression = edge.has_expression,
-                        r.viral_condition = edge.viral_condition,
-                        r.viral_condition_full = edge.viral_condition_full,
-                        r.study_id = edge.study_id,
-                        r.source = "omics"
-                """, edges=batch)
-                
-                summary = result.consume()
-                counters = summary.counters
-                
+            # Gene.symbol is not unique-constrained, so create missing genes before
+            # the parallel edge load; concurrent MERGEs could otherwise duplicate them
+            genes_df = integrated_df.drop_duplicates('gene_symbol')
+            gene_rows = [{'symbol': symbol, 'entrez_id': str(gene_id)}
+                         for symbol, gene_id in zip(genes_df['gene_symbol'], genes_df['gene_id'])]
+            for i in range(0, len(gene_rows), self.batch_size):
+                counters = session.execute_write(self._merge_viral_genes, gene_rows[i:i + self.batch_size])
                 self.stats['nodes_created'] += counters.nodes_created
-                self.stats['relationships_created'] += counters.relationships_created
                 self.stats['properties_set'] += counters.properties_set
-                
-                logger.info(f"Processed batch {i//batch_size + 1}/{(len(batch_data)-1)//batch_size + 1}")
+        
+        # Partition edges by virus so writes to the same Virus node stay on one worker
+        virus_partition = {virus_name: hash(virus_name) % self.max_workers for virus_name in virus_metadata}
+        partition_ids = integrated_df['virus_name'].map(virus_partition)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._write_edge_partition, partition_df)
+                       for _, partition_df in integrated_df.groupby(partition_ids)]
+            for future in as_completed(futures):
+                for counters in future.result():
+                    self.stats['nodes_created'] += counters.nodes_created
+                    self.stats['relationships_created'] += counters.relationships_created
+                    self.stats['properties_set'] += counters.properties_set
         
         logger.info(f"Created {self.stats['relationships_created']} viral relationships")
         return self.stats
@@ -318,6 +424,7 @@ def main():
 
     parser = argparse.ArgumentParser(description='Viral Integration Script')
     parser.add_argument('--data-dir', required=True, help='Path to data directory')
+    parser.add_argument('--resume-from', help='Integrated Parquet file from a previous run; skips parsing and integration')
     args = parser.parse_args()
 
     logger.info("=== Starting Phase 3: Viral Integration ===")
@@ -329,18 +436,33 @@ def main():
     processor = ViralIntegrationProcessor(omics_data_dir)
     
     try:
-        # Step 1: Parse viral data
-        logger.info("Step 1: Parsing viral data files...")
-        edges_df = processor.parse_viral_edges()
-        matrix_df = processor.parse_viral_matrix()
-        
-        # Step 2: Integrate data
-        logger.info("Step 2: Integrating viral data...")
-        integrated_data = processor.integrate_viral_data(edges_df, matrix_df)
+        if args.resume_from:
+            # Steps 1-2: Reuse the integrated data persisted by a previous run
+            logger.info(f"Steps 1-2: Loading integrated data from {args.resume_from}...")
+            integrated_df = pd.read_parquet(args.resume_from)
+            parsing_stats = {'resumed_from': args.resume_from}
+        else:
+            # Step 1: Parse viral data
+            logger.info("Step 1: Parsing viral data files...")
+            edges_df = processor.parse_viral_edges()
+            matrix_df = processor.parse_viral_matrix(edges_df['viral_condition_full'].unique())
+            parsing_stats = {
+                'total_edges': len(edges_df),
+                'unique_genes': edges_df['gene_symbol'].nunique(),
+                'unique_viral_conditions': edges_df['viral_condition_full'].nunique(),
+                'matrix_genes': matrix_df.shape[0],
+                'matrix_conditions': matrix_df.shape[1]
+            }
+            
+            # Step 2: Integrate data
+            logger.info("Step 2: Integrating viral data...")
+            integrated_df = processor.integrate_viral_data(edges_df, matrix_df)
+            integrated_df.to_parquet(INTEGRATED_PARQUET_FILE, index=False, compression='zstd')
+            logger.info(f"Saved integrated data to {INTEGRATED_PARQUET_FILE}")
         
         # Step 3: Create Neo4j relationships
         logger.info("Step 3: Creating Neo4j relationships...")
-        creation_stats = processor.create_viral_relationships(integrated_data)
+        creation_stats = processor.create_viral_relationships(integrated_df)
         
         # Step 4: Validate integration
         logger.info("Step 4: Validating integration...")
@@ -357,17 +479,11 @@ def main():
                 'edges_file': 'Viral_Infections__gene_attribute_edges.txt',
                 'matrix_file': 'Viral_Infections_gene_attribute_matrix_standardized.txt'
             },
-            'parsing_stats': {
-                'total_edges': len(edges_df),
-                'unique_genes': edges_df['gene_symbol'].nunique(),
-                'unique_viral_conditions': edges_df['viral_condition_full'].nunique(),
-                'matrix_genes': matrix_df.shape[0],
-                'matrix_conditions': matrix_df.shape[1]
-            },
+            'parsing_stats': parsing_stats,
             'integration_stats': {
-                'integrated_relationships': len(integrated_data),
-                'genes_with_expression': len([d for d in integrated_data if d['expression_weight'] is not None]),
-                'unique_viruses': len(set(d['virus_name'] for d in integrated_data))
+                'integrated_relationships': len(integrated_df),
+                'genes_with_expression': int(integrated_df['expression_weight'].notna().sum()),
+                'unique_viruses': integrated_df['virus_name'].nunique()
             },
             'neo4j_stats': creation_stats,
             'validation_results': validation_results
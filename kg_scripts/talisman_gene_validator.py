@@ -10,17 +10,41 @@ Based on TALISMAN_GENESET_INTEGRATION_PLAN.md Phase 2.1
 
 """
 
+import json
 import logging
-from typing import Dict, List, Optional, Set, Tuple, Any
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+import requests
 
 from talisman_geneset_parser import ParsedGeneset
 
 logger = logging.getLogger(__name__)
 
+# HGNC ID -> symbol lookups are cached here across runs
+HGNC_CACHE_PATH = Path(os.environ.get("TALISMAN_HGNC_CACHE", "~/.cache/hgnc_ids.json")).expanduser()
+
+# KG gene lookups are cached here across runs, keyed on a fingerprint of the Gene nodes
+GENE_CACHE_PATH = Path(os.environ.get("TALISMAN_GENE_CACHE", "~/.cache/talisman_gene_cache.json")).expanduser()
+
+# Concurrent HGNC REST API requests, spaced to respect its ~10 requests/second limit
+HGNC_MAX_WORKERS = 8
+HGNC_REQUEST_INTERVAL = 0.1
+
+# Genesets validated concurrently by validate_all_genesets
+VALIDATION_MAX_WORKERS = 8
+
+# Gene symbols matched per UNWIND lookup query
+GENE_LOOKUP_BATCH_SIZE = 10000
 
-@dataclass
+
+@dataclass(slots=True)
 class GeneValidationResult:
     """Result of validating genes in a geneset."""
     geneset_id: str
@@ -35,102 +59,203 @@ class GeneValidationResult:
 class GeneSymbolValidator:
     """Validates talisman gene symbols against existing knowledge graph."""
     
-    def __init__(self, neo4j_driver):
+    def __init__(self, neo4j_driver, database: str = "neo4j"):
         """
         Initialize validator with Neo4j driver.
         
         Args:
             neo4j_driver: Active Neo4j GraphDatabase driver instance
+            database: Neo4j database holding the knowledge graph
         """
         self.connection = neo4j_driver
-        self.gene_cache = {}
-        self.cache_loaded = False
+        self.database = database
+        # Matched genes stored column-wise: symbol -> row, plus one list per field
+        self._symbol_index: Dict[str, int] = {}
+        self._names: List[Optional[str]] = []
+        self._uniprot_ids: List[Optional[str]] = []
+        self._entrez_ids: List[Optional[str]] = []
+        self.symbols_checked = set()
+        self._gene_cache_lock = threading.Lock()
+        self._gene_cache_file = GENE_CACHE_PATH
+        self._kg_fingerprint = None
+        self._hgnc_cache_path = HGNC_CACHE_PATH
+        self._hgnc_cache = self._load_hgnc_cache()
+        # IDs whose HGNC request failed; not retried again during this run
+        self._hgnc_failed: Set[str] = set()
+        self._hgnc_rate_lock = threading.Lock()
+        self._hgnc_next_request = 0.0
+        self._hgnc_save_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
         self.stats = {
             "genes_in_kg": 0,
             "cache_load_time": 0,
             "validation_calls": 0
         }
     
-    def _load_gene_cache(self) -> None:
+    def _load_gene_cache(self, symbols: Iterable[str]) -> None:
         """
-        Load all genes from KG for fast lookup.
+        Look up gene symbols in the KG and cache the ones that exist.
+        
+        Symbols are matched server-side in UNWIND batches, so only genes that
+        are actually referenced travel over the wire; the MATCH relies on the
+        gene_symbol_idx index created by the schema phase. Symbols looked up before
+        are skipped, including those restored from the on-disk gene cache when
+        the database name, Gene count and latest Gene last_updated still
+        match the ones it was saved against.
         
-        Loads all 43,873 genes with their properties into memory cache
-        for efficient validation of talisman gene symbols.
+        Args:
+            symbols: Gene symbols to look up
         """
-        if self.cache_loaded:
-            return
+        # Validation threads share the cache; one lookup runs at a time
+        with self._gene_cache_lock:
+            symbols = set(symbols)
+            if self._kg_fingerprint is not None and symbols <= self.symbols_checked:
+                return
             
-        logger.info("Loading gene cache from Neo4j knowledge graph...")
-        
-        import time
-        start_time = time.time()
-        
-        # Load all genes with their properties
-        query = """
-        MATCH (g:Gene)
-        RETURN g.symbol as symbol, 
-               g.name as name, 
-               g.uniprot_id as uniprot_id,
-               g.entrez_id as entrez_id,
-               g as gene_node
-        """
-        
-        with self.connection.session() as session:
-            results = session.run(query)
+            start_time = time.time()
             
-            for row in results:
-                symbol = row.get('symbol')
-                if symbol:
-                    self.gene_cache[symbol] = {
-                        'symbol': symbol,
-                        'name': row.get('name'),
-                        'uniprot_id': row.get('uniprot_id'), 
-                    'entrez_id': row.get('entrez_id'),
-                    'properties': dict(row.get('gene_node', {}))
-                }
-        
-        self.stats["genes_in_kg"] = len(self.gene_cache)
-        self.stats["cache_load_time"] = time.time() - start_time
-        self.cache_loaded = True
-        
-        logger.info(f"Gene cache loaded: {self.stats['genes_in_kg']} genes in {self.stats['cache_load_time']:.2f}s")
+            query = """
+            UNWIND $symbols AS symbol
+            MATCH (g:Gene {symbol: symbol})
+            RETURN g.symbol as symbol, 
+                   g.name as name, 
+                   g.uniprot_id as uniprot_id,
+                   g.entrez_id as entrez_id
+            """
+            
+            # Naming the database spares the driver a home-database lookup per session
+            with self.connection.session(database=self.database) as session:
+                if self._kg_fingerprint is None:
+                    record = session.run(
+                        "MATCH (g:Gene) RETURN count(g) AS n, toString(max(g.last_updated)) AS last_updated"
+                    ).single()
+                    self._kg_fingerprint = {
+                        'database': self.database,
+                        'gene_count': record['n'],
+                        'last_updated': record['last_updated']
+                    }
+                    self._restore_gene_cache()
+                
+                pending = [symbol for symbol in symbols if symbol not in self.symbols_checked]
+                if pending:
+                    logger.info(f"Looking up {len(pending)} gene symbols in Neo4j knowledge graph...")
+                
+                for i in range(0, len(pending), GENE_LOOKUP_BATCH_SIZE):
+                    rows = session.run(query, symbols=pending[i:i + GENE_LOOKUP_BATCH_SIZE]).values()
+                    
+                    for symbol, name, uniprot_id, entrez_id in rows:
+                        self._symbol_index[symbol] = len(self._names)
+                        self._names.append(name)
+                        self._uniprot_ids.append(uniprot_id)
+                        self._entrez_ids.append(entrez_id)
+            
+            if pending:
+                self.symbols_checked.update(pending)
+                self._save_gene_cache()
+            
+            self.stats["genes_in_kg"] = len(self._symbol_index)
+            self.stats["cache_load_time"] += time.time() - start_time
+            
+            logger.info(f"Gene cache holds {self.stats['genes_in_kg']} matched genes after {self.stats['cache_load_time']:.2f}s of lookups")
+    
+    def _restore_gene_cache(self) -> None:
+        """Restore earlier gene lookups from disk if they were saved against the current KG."""
+        try:
+            with open(self._gene_cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if not isinstance(cached, dict) or cached.get('fingerprint') != self._kg_fingerprint:
+            logger.info(f"Ignoring gene cache {self._gene_cache_file}: saved against a different KG")
+            return
+        
+        try:
+            symbol_index = dict(cached['symbol_index'])
+            names = list(cached['names'])
+            uniprot_ids = list(cached['uniprot_ids'])
+            entrez_ids = list(cached['entrez_ids'])
+            symbols_checked = set(cached['symbols_checked'])
+        except (KeyError, TypeError, ValueError):
+            logger.info(f"Ignoring malformed gene cache {self._gene_cache_file}")
+            return
+        
+        self._symbol_index = symbol_index
+        self._names = names
+        self._uniprot_ids = uniprot_ids
+        self._entrez_ids = entrez_ids
+        self.symbols_checked = symbols_checked
+        logger.info(f"Restored {len(self.symbols_checked)} gene lookups from {self._gene_cache_file}")
+    
+    def _save_gene_cache(self) -> None:
+        """Persist gene lookups to disk, tagged with the KG fingerprint they were made against."""
+        cached = {
+            'fingerprint': self._kg_fingerprint,
+            'symbol_index': self._symbol_index,
+            'names': self._names,
+            'uniprot_ids': self._uniprot_ids,
+            'entrez_ids': self._entrez_ids,
+            'symbols_checked': sorted(self.symbols_checked)
+        }
+        try:
+            self._gene_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._gene_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cached, f)
+        except OSError as e:
+            logger.warning(f"Could not save gene cache to {self._gene_cache_file}: {e}")
+    
+    def _detail(self, symbol: str) -> Dict[str, Optional[str]]:
+        """Build the KG details of a matched gene from its row in the column lists."""
+        row = self._symbol_index[symbol]
+        return {
+            'symbol': symbol,
+            'name': self._names[row],
+            'uniprot_id': self._uniprot_ids[row],
+            'entrez_id': self._entrez_ids[row]
+        }
     
-    def validate_geneset_genes(self, geneset: ParsedGeneset) -> GeneValidationResult:
+    def validate_geneset_genes(self, geneset: ParsedGeneset,
+                               resolved_ids: Optional[Dict[str, Optional[str]]] = None) -> GeneValidationResult:
         """
         Validate all genes in a geneset against the KG.
         
         Args:
             geneset: ParsedGeneset to validate
+            resolved_ids: HGNC ID -> symbol map already covering the geneset's
+                gene IDs; resolved here if not given
             
         Returns:
             GeneValidationResult with detailed validation results
         """
-        self._load_gene_cache()
-        self.stats["validation_calls"] += 1
+        # Attempt to resolve gene IDs (HGNC format)
+        if resolved_ids is None:
+            resolved_ids = self._resolve_gene_ids(geneset.gene_ids)
+        resolved_symbols = [resolved_ids[gene_id] for gene_id in geneset.gene_ids]
+        self._load_gene_cache(geneset.gene_symbols + [symbol for symbol in resolved_symbols if symbol])
+        with self._stats_lock:
+            self.stats["validation_calls"] += 1
         
-        valid_genes = []
-        invalid_genes = []
         gene_ids_resolved = []
-        kg_gene_details = {}
         
-        # Validate gene symbols
+        # Validate gene symbols against the cache index, keeping the geneset's order
+        symbol_index = self._symbol_index
+        valid_genes = []
+        invalid_genes = []
         for symbol in geneset.gene_symbols:
-            if symbol in self.gene_cache:
+            if symbol in symbol_index:
                 valid_genes.append(symbol)
-                kg_gene_details[symbol] = self.gene_cache[symbol]
             else:
                 invalid_genes.append(symbol)
+        kg_gene_details = {symbol: self._detail(symbol) for symbol in valid_genes}
         
-        # Attempt to resolve gene IDs (HGNC format)
-        for gene_id in geneset.gene_ids:
-            resolved_symbol = self._resolve_gene_id(gene_id)
-            if resolved_symbol and resolved_symbol in self.gene_cache:
+        # Keep gene IDs that resolved to a KG gene
+        for resolved_symbol in resolved_symbols:
+            if resolved_symbol and resolved_symbol in self._symbol_index:
                 gene_ids_resolved.append(resolved_symbol)
-                kg_gene_details[resolved_symbol] = self.gene_cache[resolved_symbol]
+                kg_gene_details[resolved_symbol] = self._detail(resolved_symbol)
         
         # Calculate statistics
-        total_input_genes = len(geneset.gene_symbols) + len(geneset.gene_ids)
+        total_input_genes = geneset.gene_count
         total_resolved = len(valid_genes) + len(gene_ids_resolved)
         resolution_rate = total_resolved / total_input_genes if total_input_genes > 0 else 0.0
         
@@ -156,36 +281,75 @@ class GeneSymbolValidator:
         """
         logger.info(f"Validating {len(genesets)} genesets against knowledge graph...")
         
+        # Resolve every HGNC ID up front so the API is hit concurrently, not per geneset,
+        # then look up the union of symbols in the KG in as few queries as possible
+        resolved_ids = self._resolve_gene_ids(gene_id for geneset in genesets for gene_id in geneset.gene_ids)
+        all_symbols = set().union(*(geneset.gene_symbols for geneset in genesets))
+        all_symbols.update(symbol for symbol in resolved_ids.values() if symbol)
+        self._load_gene_cache(all_symbols)
+        
         results = {}
         
-        for geneset in genesets:
-            validation_result = self.validate_geneset_genes(geneset)
-            results[geneset.geneset_id] = validation_result
-            
-            if len(results) % 10 == 0:
-                logger.debug(f"Validated {len(results)}/{len(genesets)} genesets")
+        with ThreadPoolExecutor(max_workers=VALIDATION_MAX_WORKERS) as executor:
+            validations = executor.map(lambda geneset: self.validate_geneset_genes(geneset, resolved_ids), genesets)
+            for validation_result in validations:
+                results[validation_result.geneset_id] = validation_result
+                
+                if len(results) % 10 == 0:
+                    logger.debug(f"Validated {len(results)}/{len(genesets)} genesets")
         
         logger.info(f"Validation complete for {len(results)} genesets")
         return results
     
-    def _resolve_gene_id(self, gene_id: str) -> Optional[str]:
+    def _resolve_gene_ids(self, gene_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolve many HGNC gene IDs to gene symbols.
+        
+        IDs missing from the on-disk HGNC cache are fetched concurrently from the
+        HGNC REST API, and the cache is written back once they are all resolved.
+        IDs whose request failed earlier in this run are not fetched again.
+        
+        Args:
+            gene_ids: Gene IDs in HGNC format (e.g., "HGNC:11998")
+            
+        Returns:
+            Dictionary mapping each gene ID to its symbol, or None if unresolved
+        """
+        gene_ids = set(gene_ids)
+        uncached = [gene_id for gene_id in gene_ids
+                    if gene_id not in self._hgnc_cache and gene_id not in self._hgnc_failed]
+        
+        if uncached:
+            logger.info(f"Resolving {len(uncached)} HGNC IDs via the HGNC REST API...")
+            with requests.Session() as http, ThreadPoolExecutor(max_workers=HGNC_MAX_WORKERS) as executor:
+                list(executor.map(lambda gene_id: self._resolve_gene_id(gene_id, http), uncached))
+            self._save_hgnc_cache()
+        
+        return {gene_id: self._hgnc_cache.get(gene_id) for gene_id in gene_ids}
+    
+    def _resolve_gene_id(self, gene_id: str, http=None) -> Optional[str]:
         """
         Resolve HGNC gene ID to gene symbol using HGNC REST API.
         
+        Definitive answers are stored in the HGNC cache; request failures are only
+        remembered for this run, so they are retried on the next one.
+        
         Args:
             gene_id: Gene ID in HGNC format (e.g., "HGNC:11998")
+            http: Optional requests.Session to reuse connections across calls
             
         Returns:
             Gene symbol if resolved, None otherwise
         """
+        if gene_id in self._hgnc_cache:
+            return self._hgnc_cache[gene_id]
+        
         if not gene_id.startswith('HGNC:'):
             logger.warning(f"Unsupported gene ID format: {gene_id}")
+            self._hgnc_cache[gene_id] = None
             return None
         
         try:
-            import requests
-            import time
-            
             # Extract HGNC ID number
             hgnc_num = gene_id.split(':')[1]
             
@@ -193,13 +357,14 @@ class GeneSymbolValidator:
             url = f"https://rest.genenames.org/fetch/hgnc_id/{hgnc_num}"
             headers = {'Accept': 'application/json'}
             
-            # Add small delay to be respectful to the API
-            time.sleep(0.1)
+            # Stay within the API rate limit across concurrent callers
+            self._wait_for_hgnc_slot()
             
-            response = requests.get(url, headers=headers, timeout=10)
+            response = (http or requests).get(url, headers=headers, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
+                symbol = None
                 
                 # Extract gene symbol from response
                 if 'response' in data and 'docs' in data['response']:
@@ -207,17 +372,51 @@ class GeneSymbolValidator:
                     if docs and len(docs) > 0:
                         gene_doc = docs[0]
                         symbol = gene_doc.get('symbol')
-                        if symbol:
-                            logger.debug(f"Resolved {gene_id} -> {symbol}")
-                            return symbol
+                
+                self._hgnc_cache[gene_id] = symbol
+                if symbol:
+                    logger.debug(f"Resolved {gene_id} -> {symbol}")
+                    return symbol
+            else:
+                self._hgnc_failed.add(gene_id)
             
             logger.debug(f"Could not resolve HGNC ID: {gene_id}")
             return None
             
         except Exception as e:
             logger.warning(f"Error resolving HGNC ID {gene_id}: {e}")
+            self._hgnc_failed.add(gene_id)
             return None
     
+    def _wait_for_hgnc_slot(self) -> None:
+        """Block until the next HGNC request may start under the shared rate limit."""
+        with self._hgnc_rate_lock:
+            now = time.monotonic()
+            start = max(now, self._hgnc_next_request)
+            self._hgnc_next_request = start + HGNC_REQUEST_INTERVAL
+        
+        if start > now:
+            time.sleep(start - now)
+    
+    def _load_hgnc_cache(self) -> Dict[str, Optional[str]]:
+        """Load the HGNC ID -> symbol cache from disk, or start empty."""
+        try:
+            with open(self._hgnc_cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_hgnc_cache(self) -> None:
+        """Persist the HGNC ID -> symbol cache to disk."""
+        # Snapshot the cache, since other validation threads may still be adding to it
+        snapshot = dict(self._hgnc_cache)
+        try:
+            self._hgnc_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._hgnc_save_lock, open(self._hgnc_cache_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+        except OSError as e:
+            logger.warning(f"Could not save HGNC cache to {self._hgnc_cache_path}: {e}")
+    
     def generate_validation_summary(self, validation_results: Dict[str, GeneValidationResult]) -> Dict[str, Any]:
         """
         Generate comprehensive validation summary statistics.
@@ -233,12 +432,6 @@ class GeneSymbolValidator:
             "total_input_genes": 0,
             "total_resolved_genes": 0,
             "overall_resolution_rate": 0.0,
-            "collection_stats": defaultdict(lambda: {
-                "genesets": 0,
-                "input_genes": 0,
-                "resolved_genes": 0,
-                "resolution_rate": 0.0
-            }),
             "resolution_distribution": {
                 "perfect": 0,      # 100% resolution
                 "excellent": 0,    # >= 95%
@@ -246,48 +439,51 @@ class GeneSymbolValidator:
                 "moderate": 0,     # >= 60%
                 "poor": 0          # < 60%
             },
-            "unique_genes_found": set(),
-            "unique_genes_missing": set(),
             "problematic_genesets": []
         }
         
+        # Unique genes are only needed for their counts, so keep them off the summary
+        unique_genes_found = set()
+        unique_genes_missing = set()
+        
         for geneset_id, result in validation_results.items():
+            resolved = len(result.valid_genes) + len(result.gene_ids_resolved)
+            total = result.total_input_genes
+            
             # Overall stats
-            summary["total_input_genes"] += result.total_input_genes
-            summary["total_resolved_genes"] += len(result.valid_genes) + len(result.gene_ids_resolved)
+            summary["total_input_genes"] += total
+            summary["total_resolved_genes"] += resolved
             
             # Track unique genes
-            summary["unique_genes_found"].update(result.valid_genes)
-            summary["unique_genes_found"].update(result.gene_ids_resolved)
-            summary["unique_genes_missing"].update(result.invalid_genes)
+            unique_genes_found.update(result.valid_genes)
+            unique_genes_found.update(result.gene_ids_resolved)
+            unique_genes_missing.update(result.invalid_genes)
             
-            # Resolution rate distribution
-            if result.resolution_rate == 1.0:
+            # Resolution rate distribution, bucketed with exact integer arithmetic;
+            # genesets without input genes have a 0% rate and count as poor
+            if total and resolved == total:
                 summary["resolution_distribution"]["perfect"] += 1
-            elif result.resolution_rate >= 0.95:
+            elif total and resolved * 100 >= total * 95:
                 summary["resolution_distribution"]["excellent"] += 1
-            elif result.resolution_rate >= 0.80:
+            elif total and resolved * 100 >= total * 80:
                 summary["resolution_distribution"]["good"] += 1
-            elif result.resolution_rate >= 0.60:
+            elif total and resolved * 100 >= total * 60:
                 summary["resolution_distribution"]["moderate"] += 1
             else:
                 summary["resolution_distribution"]["poor"] += 1
                 summary["problematic_genesets"].append({
                     "geneset_id": geneset_id,
                     "resolution_rate": result.resolution_rate,
-                    "resolved": len(result.valid_genes) + len(result.gene_ids_resolved),
-                    "total": result.total_input_genes
+                    "resolved": resolved,
+                    "total": total
                 })
         
         # Calculate overall resolution rate
         if summary["total_input_genes"] > 0:
             summary["overall_resolution_rate"] = summary["total_resolved_genes"] / summary["total_input_genes"]
         
-        # Convert sets to counts for JSON serialization
-        summary["unique_genes_found_count"] = len(summary["unique_genes_found"])
-        summary["unique_genes_missing_count"] = len(summary["unique_genes_missing"])
-        del summary["unique_genes_found"]  # Too large for summary
-        del summary["unique_genes_missing"]  # Too large for summary
+        summary["unique_genes_found_count"] = len(unique_genes_found)
+        summary["unique_genes_missing_count"] = len(unique_genes_missing)
         
         return summary
     
@@ -303,23 +499,21 @@ class GeneSymbolValidator:
         Returns:
             Report of missing genes with frequencies
         """
-        missing_gene_counts = defaultdict(int)
+        missing_gene_counts = Counter()
         genesets_with_missing = defaultdict(list)
         
         for geneset_id, result in validation_results.items():
+            missing_gene_counts.update(result.invalid_genes)
             for missing_gene in result.invalid_genes:
-                missing_gene_counts[missing_gene] += 1
                 genesets_with_missing[missing_gene].append(geneset_id)
         
-        # Sort by frequency
-        sorted_missing = sorted(missing_gene_counts.items(), key=lambda x: x[1], reverse=True)
-        
         report = {
             "total_unique_missing": len(missing_gene_counts),
             "most_common_missing": []
         }
         
-        for gene, count in sorted_missing[:limit]:
+        # Top genes by frequency, selected with a bounded heap
+        for gene, count in missing_gene_counts.most_common(limit):
             report["most_common_missing"].append({
                 "gene_symbol": gene,
                 "missing_from_genesets": count,
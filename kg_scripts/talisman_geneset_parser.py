@@ -13,17 +13,56 @@ Handles 3 data formats:
 """
 
 import yaml
-import json
 import logging
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Union, Any
 from dataclasses import dataclass, field
 
+# Prefer the libyaml-backed loader; fall back to the pure-Python one if PyYAML lacks it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# orjson parses straight from bytes several times faster than the stdlib
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 logger = logging.getLogger(__name__)
 
+# Geneset ID normalization patterns
+_NON_WORD = re.compile(r'[^\w]')
+_MULTI_UNDERSCORE = re.compile(r'_+')
+
+# YAML fields copied onto ParsedGeneset attributes, so not repeated in its metadata
+YAML_PARSED_FIELDS = frozenset({'name', 'gene_symbols', 'gene_ids', 'description', 'descriptions', 'taxon'})
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_PARSE_MIN_FILES = 8
+
+
+def _parse_file(parse, file_path: Path):
+    """Run a parse method on one file in a worker, returning (result, error message)."""
+    try:
+        return parse(file_path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _unique_stripped(values) -> List[str]:
+    """Strip values, drop empty ones and deduplicate, preserving first-seen order."""
+    if not values:
+        return []
+    stripped = (value.strip() for value in values if value)
+    return list(dict.fromkeys(value for value in stripped if value))
 
-@dataclass
+
+@dataclass(slots=True)
 class ParsedGeneset:
     """Standardized representation of a parsed geneset."""
     geneset_id: str
@@ -35,16 +74,15 @@ class ParsedGeneset:
     source_file: str = ""
     source_collection: str = ""  # HALLMARK, BICLUSTER, CUSTOM
     metadata: Dict[str, Any] = field(default_factory=dict)
+    gene_count: int = field(init=False, default=0)  # Symbols plus IDs, set after cleanup
     
     def __post_init__(self):
         """Post-initialization validation and cleanup."""
-        # Ensure gene symbols are unique and clean
-        self.gene_symbols = list(set(self.gene_symbols)) if self.gene_symbols else []
-        self.gene_ids = list(set(self.gene_ids)) if self.gene_ids else []
-        
-        # Clean up gene symbols (remove whitespace, empty strings)
-        self.gene_symbols = [s.strip() for s in self.gene_symbols if s and s.strip()]
-        self.gene_ids = [s.strip() for s in self.gene_ids if s and s.strip()]
+        # Clean up gene symbols (remove whitespace, empty strings) and keep the
+        # first occurrence of each, in input order
+        self.gene_symbols = _unique_stripped(self.gene_symbols)
+        self.gene_ids = _unique_stripped(self.gene_ids)
+        self.gene_count = len(self.gene_symbols) + len(self.gene_ids)
 
 
 class TalismanGenesetParser:
@@ -84,17 +122,31 @@ class TalismanGenesetParser:
         genesets = []
         geneset_dict = {}  # geneset_id -> ParsedGeneset (for deduplication)
         
+        # Classify geneset files in a single directory scan
+        yaml_files, json_files = [], []
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith('.yaml'):
+                    yaml_files.append(Path(entry.path))
+                elif entry.name.endswith('.json'):
+                    json_files.append(Path(entry.path))
+        
         # Process YAML files first
-        yaml_files = list(self.data_dir.glob("*.yaml"))
         logger.info(f"Found {len(yaml_files)} YAML files")
         
-        for file_path in yaml_files:
+        for file_path, geneset, error in self._parse_files(self._parse_yaml_file, yaml_files):
+            if error:
+                logger.error(f"Error parsing YAML file {file_path}: {error}")
+                self.stats["parse_errors"] += 1
+                continue
+            
             try:
-                geneset = self._parse_yaml_file(file_path)
                 geneset_dict[geneset.geneset_id] = geneset
                 self.stats["yaml_files"] += 1
                 self.stats["files_processed"] += 1
-                self.stats["total_genes_parsed"] += len(geneset.gene_symbols) + len(geneset.gene_ids)
+                self.stats["total_genes_parsed"] += geneset.gene_count
                 self.stats["collection_counts"][geneset.source_collection] += 1
                 
                 logger.debug(f"Parsed YAML: {file_path.name} -> {geneset.geneset_id} ({len(geneset.gene_symbols)} genes)")
@@ -104,21 +156,23 @@ class TalismanGenesetParser:
                 self.stats["parse_errors"] += 1
         
         # Process JSON files (will override YAML if duplicate)
-        json_files = list(self.data_dir.glob("*.json"))
         logger.info(f"Found {len(json_files)} JSON files")
         
         duplicates_resolved = 0
-        for file_path in json_files:
+        for file_path, parsed_genesets, error in self._parse_files(self._parse_json_file, json_files):
+            if error:
+                logger.error(f"Error parsing JSON file {file_path}: {error}")
+                self.stats["parse_errors"] += 1
+                continue
+            
             try:
-                parsed_genesets = self._parse_json_file(file_path)
-                
                 for geneset in parsed_genesets:
                     if geneset.geneset_id in geneset_dict:
                         logger.info(f"Resolving duplicate: preferring JSON over YAML for {geneset.geneset_id}")
                         duplicates_resolved += 1
                     
                     geneset_dict[geneset.geneset_id] = geneset  # JSON overwrites YAML
-                    self.stats["total_genes_parsed"] += len(geneset.gene_symbols) + len(geneset.gene_ids)
+                    self.stats["total_genes_parsed"] += geneset.gene_count
                     self.stats["collection_counts"][geneset.source_collection] += 1
                 
                 self.stats["json_files"] += 1
@@ -139,6 +193,24 @@ class TalismanGenesetParser:
         
         return genesets
     
+    def _parse_files(self, parse, file_paths: List[Path]):
+        """
+        Parse files with the given parse method, across processes for larger batches.
+        
+        Args:
+            parse: Bound parse method (_parse_yaml_file or _parse_json_file)
+            file_paths: Files to parse
+            
+        Returns:
+            List of (file_path, result, error message) tuples in file order
+        """
+        if len(file_paths) < PARALLEL_PARSE_MIN_FILES:
+            return [(file_path, *_parse_file(parse, file_path)) for file_path in file_paths]
+        
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = executor.map(_parse_file, [parse] * len(file_paths), file_paths, chunksize=4)
+            return [(file_path, *result) for file_path, result in zip(file_paths, results)]
+    
     def _parse_yaml_file(self, file_path: Path) -> ParsedGeneset:
         """
         Parse a single YAML geneset file.
@@ -149,8 +221,8 @@ class TalismanGenesetParser:
         Returns:
             ParsedGeneset object
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        # Hand the loader the raw bytes in one read; it detects the encoding itself
+        data = yaml.load(file_path.read_bytes(), Loader=_YamlLoader)
         
         if not isinstance(data, dict):
             raise ValueError(f"Expected dict in YAML file {file_path}, got {type(data)}")
@@ -188,7 +260,7 @@ class TalismanGenesetParser:
             taxon=taxon,
             source_file=file_path.name,
             source_collection=source_collection,
-            metadata=data
+            metadata={key: value for key, value in data.items() if key not in YAML_PARSED_FIELDS}
         )
     
     def _parse_json_file(self, file_path: Path) -> List[ParsedGeneset]:
@@ -203,14 +275,16 @@ class TalismanGenesetParser:
         Returns:
             List of ParsedGeneset objects (usually 1 per file)
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = _json.loads(file_path.read_bytes())
         
         if not isinstance(data, dict):
             raise ValueError(f"Expected dict in JSON file {file_path}, got {type(data)}")
         
         genesets = []
         
+        # Every geneset in a file belongs to the file's collection
+        source_collection = self._classify_collection(file_path.name)
+        
         # JSON files typically have structure: {"GENESET_NAME": {"systematicName": ..., "geneSymbols": [...]}}
         for geneset_name, geneset_data in data.items():
             if not isinstance(geneset_data, dict):
@@ -235,11 +309,8 @@ class TalismanGenesetParser:
             elif systematic_name:
                 description = f"MSigDB geneset ({systematic_name})"
             
-            # Classify collection type
-            source_collection = self._classify_collection(file_path.name)
-            
             # Add MSigDB metadata
-            metadata = dict(geneset_data)
+            metadata = {key: value for key, value in geneset_data.items() if key != 'geneSymbols'}
             if msigdb_url:
                 metadata['msigdb_url'] = msigdb_url
             if pmid:
@@ -277,10 +348,10 @@ class TalismanGenesetParser:
             return "UNKNOWN_GENESET"
         
         # Convert to uppercase and replace spaces/hyphens with underscores
-        geneset_id = re.sub(r'[^\w]', '_', name.upper())
+        geneset_id = _NON_WORD.sub('_', name.upper())
         
         # Remove multiple consecutive underscores
-        geneset_id = re.sub(r'_+', '_', geneset_id)
+        geneset_id = _MULTI_UNDERSCORE.sub('_', geneset_id)
         
         # Remove leading/trailing underscores
         geneset_id = geneset_id.strip('_')
@@ -340,7 +411,7 @@ class TalismanGenesetParser:
         
         for geneset in genesets:
             # Count genes
-            gene_count = len(geneset.gene_symbols) + len(geneset.gene_ids)
+            gene_count = geneset.gene_count
             total_gene_count += gene_count
             
             if gene_count > 0:
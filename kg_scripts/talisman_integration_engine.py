@@ -11,19 +11,73 @@ error recovery, and integration validation.
 import logging
 import sys
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
-from datetime import datetime
-from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from datetime import datetime, timezone
+from itertools import islice
+from neo4j import GraphDatabase, RoutingControl
 
-from config.neo4j_config import NEO4J_CONFIG, BATCH_CONFIG
+from config.neo4j_config import NEO4J_CONFIG, NEO4J_CONNECTION_POOL, BATCH_CONFIG
 
 from talisman_geneset_parser import ParsedGeneset
-from talisman_gene_validator import GeneSymbolValidator, GeneValidationResult
+from talisman_gene_validator import GeneSymbolValidator
 
 logger = logging.getLogger(__name__)
 
+# GenesetCollection nodes every CuratedGeneset links to via source_collection
+GENESET_COLLECTIONS = [
+    {
+        'collection_id': 'HALLMARK',
+        'collection_name': 'MSigDB Hallmark Collection', 
+        'description': 'Hallmark gene sets summarize and represent specific well-defined biological states or processes',
+        'source_authority': 'MSigDB',
+        'total_genesets': 50  # Will be updated after integration
+    },
+    {
+        'collection_id': 'BICLUSTER',
+        'collection_name': 'RNAseqDB Bicluster Collection',
+        'description': 'Co-expressed gene clusters from RNAseq database analysis',
+        'source_authority': 'RNAseqDB', 
+        'total_genesets': 3
+    },
+    {
+        'collection_id': 'CUSTOM',
+        'collection_name': 'Literature-Curated Research Sets',
+        'description': 'Manually curated gene sets from research literature',
+        'source_authority': 'Literature',
+        'total_genesets': 20  # Will be updated after integration
+    }
+]
+
+# Writes one batch of genesets: node, collection link and gene memberships per row
+_GENESET_BATCH_CYPHER = """
+UNWIND $rows AS row
+WITH row, datetime($run_ts) AS run_date
+MERGE (cg:CuratedGeneset {geneset_id: row.geneset_id})
+SET cg += row.properties
+WITH cg, row, run_date
+OPTIONAL MATCH (gc:GenesetCollection {collection_id: row.collection_id})
+FOREACH (_ IN CASE WHEN gc IS NULL THEN [] ELSE [1] END |
+    MERGE (cg)-[r:PART_OF_COLLECTION]->(gc)
+    SET r.integration_date = run_date
+)
+WITH cg, row, gc, run_date
+CALL {
+    WITH cg, row, run_date
+    UNWIND row.gene_symbols AS gene_symbol
+    MATCH (g:Gene {symbol: gene_symbol})
+    MERGE (g)-[r:CURATED_MEMBER_OF]->(cg)
+    SET r.integration_date = run_date,
+        r.validation_status = 'VALIDATED'
+    RETURN count(r) AS gene_relationships
+}
+RETURN count(cg) AS genesets_created,
+       count(gc) AS collection_relationships_created,
+       sum(gene_relationships) AS gene_relationships_created
+"""
+
 
 @dataclass
 class IntegrationResults:
@@ -60,17 +114,36 @@ class TalismanIntegrationEngine:
         """
         Initialize integration engine with config-based Neo4j connection.
         """
+        self.batch_size = BATCH_CONFIG['batch_size']
+        self.max_workers = BATCH_CONFIG.get('workers', 8)
+        # Size the pool so every batch worker and its retries can hold a connection
         self.driver = GraphDatabase.driver(
             NEO4J_CONFIG['uri'], 
-            auth=(NEO4J_CONFIG['username'], NEO4J_CONFIG['password'])
+            auth=(NEO4J_CONFIG['username'], NEO4J_CONFIG['password']),
+            max_connection_pool_size=max(NEO4J_CONNECTION_POOL['max_connection_pool_size'], self.max_workers * 2),
+            max_transaction_retry_time=NEO4J_CONNECTION_POOL['max_transaction_retry_time'],
+            connection_acquisition_timeout=120,
+            keep_alive=True
         )
-        self.gene_validator = GeneSymbolValidator(self.driver)
-        self.batch_size = BATCH_CONFIG['batch_size']
+        self.gene_validator = GeneSymbolValidator(self.driver, database=NEO4J_CONFIG['database'])
+        self._gene_rows: Dict[str, Tuple[str, ...]] = {}
+        
+        # Case-insensitive source_collection -> collection_id lookup
+        self._collection_id_of = {
+            collection['collection_id'].casefold(): collection['collection_id']
+            for collection in GENESET_COLLECTIONS
+        }
         
     def close(self):
         """Close Neo4j driver connection."""
         if self.driver:
             self.driver.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
         
     def integrate_all_genesets(self, parsed_genesets: List[ParsedGeneset], 
                               dry_run: bool = False) -> IntegrationResults:
@@ -91,18 +164,36 @@ class TalismanIntegrationEngine:
         
         results = IntegrationResults()
         
+        # Single timestamp shared by every write in this run
+        run_ts = datetime.now(timezone.utc).isoformat()
+        
+        # Fail fast on collections that no GenesetCollection node would match
+        unknown_collections = {
+            geneset.source_collection for geneset in parsed_genesets
+            if geneset.source_collection.casefold() not in self._collection_id_of
+        }
+        if unknown_collections:
+            raise ValueError(f"Unknown source collections: {sorted(unknown_collections)}")
+        
         try:
             # Step 1: Create schema if not exists
             if not dry_run:
                 logger.info("Step 1: Creating schema extensions...")
                 from talisman_schema_setup import TalismanSchemaSetup
-                schema_setup = TalismanSchemaSetup(self.driver)
+                schema_setup = TalismanSchemaSetup(self.driver, database=NEO4J_CONFIG['database'])
                 schema_results = schema_setup.create_schema()
                 logger.info(f"Schema setup: {schema_results}")
+                
+                # Validation matches by name, so an equivalent index under another
+                # name (e.g. from apoc.schema.assert) is reported missing; warn only
+                schema_validation = schema_setup.validate_schema()
+                if schema_validation['overall_status'] != 'PASS':
+                    logger.warning("Talisman schema not found by name, MERGEs may be unindexed: %s",
+                                   schema_validation)
             
             # Step 2: Create geneset collections
             logger.info("Step 2: Creating geneset collections...")
-            collection_results = self._create_collections(dry_run=dry_run)
+            collection_results = self._create_collections(run_ts, dry_run=dry_run)
             results.collections_created = collection_results
             
             # Step 3: Validate all genes first
@@ -110,14 +201,21 @@ class TalismanIntegrationEngine:
             validation_results = self.gene_validator.validate_all_genesets(parsed_genesets)
             logger.info(f"Gene validation complete: {len(validation_results)} genesets validated")
             
+            # Merge and dedupe each geneset's valid genes once for all batch workers
+            self._gene_rows = {
+                geneset_id: tuple(dict.fromkeys(validation.valid_genes + validation.gene_ids_resolved))
+                for geneset_id, validation in validation_results.items()
+            }
+            
             # Step 4: Create geneset nodes and relationships in batches
             logger.info("Step 4: Creating genesets and relationships in batches...")
-            geneset_batches = self._create_geneset_batches(parsed_genesets)
+            total_batches = (len(parsed_genesets) + self.batch_size - 1) // self.batch_size
             
-            for batch_num, batch in enumerate(geneset_batches, 1):
-                logger.info(f"Processing batch {batch_num}/{len(geneset_batches)} ({len(batch)} genesets)")
-                
-                batch_results = self._integrate_geneset_batch(batch, validation_results, dry_run=dry_run)
+            batches = self._run_geneset_batches(parsed_genesets, run_ts, dry_run)
+            for batch_num, batch_results in enumerate(batches, 1):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Completed batch %d/%d (%d genesets)", batch_num, total_batches,
+                                 batch_results['genesets_created'])
                 
                 results.genesets_created += batch_results['genesets_created']
                 results.gene_relationships_created += batch_results['gene_relationships_created']
@@ -126,12 +224,12 @@ class TalismanIntegrationEngine:
                 results.batches_processed += 1
                 
                 if batch_num % 5 == 0:
-                    logger.info(f"Progress: {batch_num}/{len(geneset_batches)} batches completed")
+                    logger.info("Progress: %d/%d batches completed", batch_num, total_batches)
             
             # Step 5: Create enrichment relationships with existing modules
             logger.info("Step 5: Creating enrichment relationships with existing FunctionalModules...")
             if not dry_run:
-                enrichment_count = self._create_enrichment_relationships()
+                enrichment_count = self._create_enrichment_relationships(run_ts)
                 results.enrichment_relationships_created = enrichment_count
                 logger.info(f"Created {enrichment_count} enrichment relationships")
             
@@ -148,91 +246,93 @@ class TalismanIntegrationEngine:
             results.processing_time_seconds = time.time() - start_time
             raise
     
-    def _create_collections(self, dry_run: bool = False) -> int:
+    def _create_collections(self, run_ts: str, dry_run: bool = False) -> int:
         """
         Create GenesetCollection nodes.
         
         Args:
+            run_ts: ISO timestamp of the integration run
             dry_run: If True, don't actually create nodes
             
         Returns:
             Number of collections created
         """
-        collections = [
-            {
-                'collection_id': 'HALLMARK',
-                'collection_name': 'MSigDB Hallmark Collection', 
-                'description': 'Hallmark gene sets summarize and represent specific well-defined biological states or processes',
-                'source_authority': 'MSigDB',
-                'total_genesets': 50  # Will be updated after integration
-            },
-            {
-                'collection_id': 'BICLUSTER',
-                'collection_name': 'RNAseqDB Bicluster Collection',
-                'description': 'Co-expressed gene clusters from RNAseq database analysis',
-                'source_authority': 'RNAseqDB', 
-                'total_genesets': 3
-            },
-            {
-                'collection_id': 'CUSTOM',
-                'collection_name': 'Literature-Curated Research Sets',
-                'description': 'Manually curated gene sets from research literature',
-                'source_authority': 'Literature',
-                'total_genesets': 20  # Will be updated after integration
-            }
-        ]
+        collections = GENESET_COLLECTIONS
         
         if dry_run:
             logger.info(f"DRY RUN: Would create {len(collections)} collections")
             return len(collections)
         
-        created_count = 0
-        for collection in collections:
-            query = """
-            MERGE (gc:GenesetCollection {collection_id: $collection_id})
-            SET gc.collection_name = $collection_name,
-                gc.description = $description,
-                gc.source_authority = $source_authority,
-                gc.total_genesets = $total_genesets,
-                gc.integration_date = datetime(),
-                gc.last_updated = datetime()
-            RETURN gc.collection_id as id
-            """
-            
-            with self.driver.session() as session:
-                result = session.run(query, collection)
-                if result.single():
-                    created_count += 1
-                    logger.debug(f"Created/updated collection: {collection['collection_id']}")
+        query = """
+        UNWIND $collections AS collection
+        MERGE (gc:GenesetCollection {collection_id: collection.collection_id})
+        SET gc += collection,
+            gc.integration_date = datetime($run_ts),
+            gc.last_updated = datetime($run_ts)
+        RETURN count(gc) as created_count
+        """
+        
+        with self.driver.session(database=NEO4J_CONFIG['database']) as session:
+            record = session.run(query, collections=collections, run_ts=run_ts).single()
+            created_count = record['created_count'] if record else 0
         
         logger.info(f"Created/updated {created_count} geneset collections")
         return created_count
     
-    def _create_geneset_batches(self, genesets: List[ParsedGeneset]) -> List[List[ParsedGeneset]]:
+    def _run_geneset_batches(self, genesets: Iterable[ParsedGeneset], run_ts: str,
+                             dry_run: bool) -> Iterator[Dict[str, Any]]:
         """
-        Create batches of genesets for efficient processing.
+        Integrate geneset batches concurrently.
+        
+        At most max_workers batches are in flight, so batches are still pulled
+        from the generator lazily. Each worker writes its batch in its own
+        session on the shared driver; execute_write retries transient deadlocks
+        on shared Gene/collection nodes.
         
         Args:
-            genesets: List of genesets to batch
+            genesets: Genesets to integrate
+            run_ts: ISO timestamp of the integration run
+            dry_run: If True, don't actually write anything
             
-        Returns:
-            List of geneset batches
+        Yields:
+            Batch results as batches complete
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for batch in self._iter_geneset_batches(genesets):
+                if len(pending) >= self.max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(executor.submit(self._integrate_geneset_batch, batch, run_ts, dry_run))
+            for future in as_completed(pending):
+                yield future.result()
+    
+    def _iter_geneset_batches(self, genesets: Iterable[ParsedGeneset]) -> Iterator[List[ParsedGeneset]]:
         """
-        batches = []
-        for i in range(0, len(genesets), self.batch_size):
-            batch = genesets[i:i + self.batch_size]
-            batches.append(batch)
-        return batches
+        Yield batches of genesets for efficient processing.
+        
+        Args:
+            genesets: Genesets to batch
+            
+        Yields:
+            Geneset batches of at most batch_size entries
+        """
+        genesets = iter(genesets)
+        while True:
+            batch = list(islice(genesets, self.batch_size))
+            if not batch:
+                return
+            yield batch
     
     def _integrate_geneset_batch(self, geneset_batch: List[ParsedGeneset], 
-                                validation_results: Dict[str, GeneValidationResult],
-                                dry_run: bool = False) -> Dict[str, Any]:
+                                run_ts: str, dry_run: bool = False) -> Dict[str, Any]:
         """
         Integrate a batch of genesets into Neo4j.
         
         Args:
             geneset_batch: Batch of genesets to integrate
-            validation_results: Gene validation results
+            run_ts: ISO timestamp of the integration run
             dry_run: If True, don't actually create nodes
             
         Returns:
@@ -245,66 +345,91 @@ class TalismanIntegrationEngine:
             'failures': []
         }
         
-        for geneset in geneset_batch:
-            try:
-                if dry_run:
-                    logger.debug(f"DRY RUN: Would integrate {geneset.geneset_id}")
-                    batch_results['genesets_created'] += 1
-                    
-                    # Count what relationships would be created
-                    validation = validation_results.get(geneset.geneset_id)
-                    if validation:
-                        gene_count = len(validation.valid_genes) + len(validation.gene_ids_resolved)
-                        batch_results['gene_relationships_created'] += gene_count
-                    batch_results['collection_relationships_created'] += 1
-                    continue
-                
-                # Create geneset node
-                geneset_node_result = self._create_geneset_node(geneset)
-                if geneset_node_result:
-                    batch_results['genesets_created'] += 1
-                
-                # Create collection relationship
-                collection_rel_result = self._create_collection_relationship(geneset)
-                if collection_rel_result:
-                    batch_results['collection_relationships_created'] += 1
-                
-                # Create gene relationships
-                validation = validation_results.get(geneset.geneset_id)
-                if validation:
-                    gene_rel_count = self._create_gene_relationships(geneset, validation)
-                    batch_results['gene_relationships_created'] += gene_rel_count
+        if dry_run:
+            for geneset in geneset_batch:
+                logger.debug("DRY RUN: Would integrate %s", geneset.geneset_id)
+                batch_results['genesets_created'] += 1
                 
-            except Exception as e:
-                error_info = {
+                # Count what relationships would be created
+                batch_results['gene_relationships_created'] += len(self._gene_rows.get(geneset.geneset_id, ()))
+                batch_results['collection_relationships_created'] += 1
+            return batch_results
+        
+        # One managed transaction for the whole batch
+        try:
+            batch_results.update(self._write_geneset_batch(geneset_batch, run_ts))
+        except Exception as e:
+            for geneset in geneset_batch:
+                batch_results['failures'].append({
                     'geneset_id': geneset.geneset_id,
                     'source_file': geneset.source_file,
                     'error': str(e)
-                }
-                batch_results['failures'].append(error_info)
-                logger.error(f"Failed to integrate {geneset.geneset_id}: {e}")
+                })
+            logger.error(f"Failed to integrate batch of {len(geneset_batch)} genesets: {e}")
         
         return batch_results
     
-    def _create_geneset_node(self, geneset: ParsedGeneset) -> bool:
+    def _write_geneset_batch(self, geneset_batch: List[ParsedGeneset],
+                             run_ts: str) -> Dict[str, int]:
+        """
+        Write a batch of genesets and their relationships in one transaction.
+        
+        Nodes, collection links and gene memberships for the whole batch are
+        written by a single UNWIND query instead of three queries per geneset.
+        
+        Args:
+            geneset_batch: Batch of genesets to integrate
+            run_ts: ISO timestamp of the integration run
+            
+        Returns:
+            Counts of created genesets and relationships
+        """
+        rows = [self._geneset_row(geneset, run_ts)
+                for geneset in geneset_batch]
+        
+        records, _, _ = self.driver.execute_query(
+            _GENESET_BATCH_CYPHER,
+            rows=rows,
+            run_ts=run_ts,
+            database_=NEO4J_CONFIG['database'],
+            routing_=RoutingControl.WRITE
+        )
+        if not records:
+            return {
+                'genesets_created': 0,
+                'gene_relationships_created': 0,
+                'collection_relationships_created': 0
+            }
+        
+        record = records[0]
+        return {
+            'genesets_created': record['genesets_created'],
+            'gene_relationships_created': record['gene_relationships_created'] or 0,
+            'collection_relationships_created': record['collection_relationships_created']
+        }
+    
+    def _geneset_row(self, geneset: ParsedGeneset, run_ts: str) -> Dict[str, Any]:
         """
-        Create a single CuratedGeneset node.
+        Build the UNWIND row for a single geneset.
         
         Args:
-            geneset: ParsedGeneset to create
+            geneset: ParsedGeneset to write
+            run_ts: ISO timestamp of the integration run
             
         Returns:
-            True if created successfully
+            Row with node properties, collection id and valid gene symbols
         """
+        collection_id = self._collection_id_of[geneset.source_collection.casefold()]
+        
         # Prepare geneset properties
         properties = {
             'geneset_id': geneset.geneset_id,
             'name': geneset.name,
-            'source_collection': geneset.source_collection,
+            'source_collection': collection_id,
             'source_file': geneset.source_file,
             'taxon': geneset.taxon,
-            'gene_count': len(geneset.gene_symbols) + len(geneset.gene_ids),
-            'integration_date': datetime.now().isoformat(),
+            'gene_count': geneset.gene_count,
+            'integration_date': run_ts,
             'validation_status': 'VALIDATED'
         }
         
@@ -322,101 +447,26 @@ class TalismanIntegrationEngine:
         if 'msigdb_url' in geneset.metadata and geneset.metadata['msigdb_url']:
             properties['msigdb_url'] = geneset.metadata['msigdb_url']
         
-        # Create the node
-        query = """
-        MERGE (cg:CuratedGeneset {geneset_id: $geneset_id})
-        SET cg += $properties
-        RETURN cg.geneset_id as id
-        """
+        # Valid genes were merged and deduplicated after validation
+        valid_genes = self._gene_rows.get(geneset.geneset_id)
+        if valid_genes is None:
+            valid_genes = ()
+        elif not valid_genes:
+            logger.warning("No valid genes found for geneset %s", geneset.geneset_id)
         
-        with self.driver.session() as session:
-            result = session.run(query, {
-                'geneset_id': geneset.geneset_id,
-                'properties': properties
-            })
-            return len(list(result)) > 0
-    
-    def _create_collection_relationship(self, geneset: ParsedGeneset) -> bool:
-        """
-        Create PART_OF_COLLECTION relationship.
-        
-        Args:
-            geneset: ParsedGeneset to link to collection
-            
-        Returns:
-            True if relationship created
-        """
-        query = """
-        MATCH (cg:CuratedGeneset {geneset_id: $geneset_id})
-        MATCH (gc:GenesetCollection {collection_id: $collection_id})
-        MERGE (cg)-[r:PART_OF_COLLECTION]->(gc)
-        SET r.integration_date = datetime()
-        RETURN count(r) as count
-        """
-        
-        with self.driver.session() as session:
-            result = session.run(query, {
-                'geneset_id': geneset.geneset_id,
-                'collection_id': geneset.source_collection
-            })
-            record = result.single()
-            return record and record['count'] > 0
-    
-    def _create_gene_relationships(self, geneset: ParsedGeneset, 
-                                 validation: GeneValidationResult) -> int:
-        """
-        Create CURATED_MEMBER_OF relationships between genes and geneset.
-        
-        Args:
-            geneset: ParsedGeneset to link genes to
-            validation: Gene validation results
-            
-        Returns:
-            Number of relationships created
-        """
-        # Collect all valid genes
-        valid_genes = validation.valid_genes + validation.gene_ids_resolved
-        
-        if not valid_genes:
-            logger.warning(f"No valid genes found for geneset {geneset.geneset_id}")
-            return 0
-        
-        # Create relationships in batches for performance
-        gene_batches = [valid_genes[i:i+500] for i in range(0, len(valid_genes), 500)]
-        total_created = 0
-        
-        for gene_batch in gene_batches:
-            query = """
-            MATCH (cg:CuratedGeneset {geneset_id: $geneset_id})
-            UNWIND $gene_symbols as gene_symbol
-            MATCH (g:Gene {symbol: gene_symbol})
-            MERGE (g)-[r:CURATED_MEMBER_OF]->(cg)
-            SET r.integration_date = datetime(),
-                r.validation_status = 'VALIDATED',
-                r.source_file = $source_file
-            RETURN count(r) as relationships_created
-            """
-            
-            with self.driver.session() as session:
-                result = session.run(query, {
-                    'geneset_id': geneset.geneset_id,
-                    'gene_symbols': gene_batch,
-                    'source_file': geneset.source_file
-                })
-            
-                record = result.single()
-                if record:
-                    batch_count = record['relationships_created']
-                    total_created += batch_count
-                    logger.debug(f"Created {batch_count} gene relationships for {geneset.geneset_id}")
-        
-        return total_created
+        return {
+            'geneset_id': geneset.geneset_id,
+            'properties': properties,
+            'collection_id': collection_id,
+            'gene_symbols': valid_genes
+        }
     
-    def _create_enrichment_relationships(self, overlap_threshold: float = 0.3) -> int:
+    def _create_enrichment_relationships(self, run_ts: str, overlap_threshold: float = 0.3) -> int:
         """
         Create ENRICHES_MODULE relationships for significant overlaps with FunctionalModules.
         
         Args:
+            run_ts: ISO timestamp of the integration run
             overlap_threshold: Minimum overlap ratio to create relationship
             
         Returns:
@@ -424,28 +474,51 @@ class TalismanIntegrationEngine:
         """
         logger.info(f"Analyzing overlaps with existing FunctionalModules (threshold: {overlap_threshold})")
         
+        # Module sizes read once and passed as a map, so they are not re-expanded
+        # per (cg, fm) pair and nothing is written to the modules
+        module_size_query = """
+        MATCH (fm:FunctionalModule)
+        RETURN fm.name AS name, size([(fm)<-[:BELONGS_TO_MODULE]-(:Gene) | 1]) AS member_count
+        """
+        
+        # Commit MERGEs in slices so the (cg, fm) pairs never sit in one transaction.
+        # Not parallel: every pair of a geneset locks the same CuratedGeneset node.
         query = """
-        MATCH (cg:CuratedGeneset)<-[:CURATED_MEMBER_OF]-(g:Gene)-[:BELONGS_TO_MODULE]->(fm:FunctionalModule)
-        WITH cg, fm, count(g) as overlap_count, 
-             size([(cg)<-[:CURATED_MEMBER_OF]-(all_curated:Gene) | all_curated]) as curated_size,
-             size([(fm)<-[:BELONGS_TO_MODULE]-(all_module:Gene) | all_module]) as module_size
-        WITH cg, fm, overlap_count, curated_size, module_size,
-             (overlap_count * 1.0 / curated_size) as curated_coverage,
-             (overlap_count * 1.0 / module_size) as module_coverage
-        WHERE curated_coverage >= $threshold OR module_coverage >= $threshold
-        MERGE (cg)-[r:ENRICHES_MODULE]->(fm)
-        SET r.overlap_count = overlap_count,
-            r.curated_coverage = curated_coverage,
-            r.module_coverage = module_coverage,
-            r.enrichment_score = (curated_coverage + module_coverage) / 2,
-            r.analysis_date = datetime()
-        RETURN count(r) as relationships_created
+        CALL apoc.periodic.iterate(
+            "MATCH (cg:CuratedGeneset)
+             WITH cg, size([(cg)<-[:CURATED_MEMBER_OF]-(:Gene) | 1]) as curated_size
+             MATCH (cg)<-[:CURATED_MEMBER_OF]-(g:Gene)-[:BELONGS_TO_MODULE]->(fm:FunctionalModule)
+             WITH cg, curated_size, fm, count(g) as overlap_count
+             WITH cg, fm, overlap_count,
+                  (overlap_count * 1.0 / curated_size) as curated_coverage,
+                  (overlap_count * 1.0 / $module_sizes[fm.name]) as module_coverage
+             WHERE curated_coverage >= $threshold OR module_coverage >= $threshold
+             RETURN cg, fm, overlap_count, curated_coverage, module_coverage",
+            "MERGE (cg)-[r:ENRICHES_MODULE]->(fm)
+             SET r.overlap_count = overlap_count,
+                 r.curated_coverage = curated_coverage,
+                 r.module_coverage = module_coverage,
+                 r.enrichment_score = (curated_coverage + module_coverage) / 2,
+                 r.analysis_date = datetime($run_ts)",
+            {batchSize: $batch_size, parallel: false, params: {threshold: $threshold, run_ts: $run_ts, module_sizes: $module_sizes}}
+        )
+        YIELD committedOperations, failedOperations, errorMessages
+        RETURN committedOperations as relationships_created, failedOperations, errorMessages
         """
         
-        with self.driver.session() as session:
-            result = session.run(query, {'threshold': overlap_threshold})
+        with self.driver.session(database=NEO4J_CONFIG['database']) as session:
+            module_sizes = {record['name']: record['member_count'] for record in session.run(module_size_query)}
+            result = session.run(query, {
+                'threshold': overlap_threshold,
+                'module_sizes': module_sizes,
+                'run_ts': run_ts,
+                'batch_size': self.batch_size
+            })
             record = result.single()
             if record:
+                if record['failedOperations']:
+                    logger.error(f"Failed to create {record['failedOperations']} enrichment relationships: "
+                                 f"{record['errorMessages']}")
                 count = record['relationships_created']
                 logger.info(f"Created {count} enrichment relationships with existing modules")
                 return count
@@ -461,46 +534,39 @@ class TalismanIntegrationEngine:
         """
         logger.info("Validating talisman integration...")
         
-        validation_queries = {
-            'curated_genesets': "MATCH (cg:CuratedGeneset) RETURN count(cg) as count",
-            'geneset_collections': "MATCH (gc:GenesetCollection) RETURN count(gc) as count",
-            'curated_memberships': "MATCH ()-[r:CURATED_MEMBER_OF]->() RETURN count(r) as count",
-            'collection_relationships': "MATCH ()-[r:PART_OF_COLLECTION]->() RETURN count(r) as count",
-            'enrichment_relationships': "MATCH ()-[r:ENRICHES_MODULE]->() RETURN count(r) as count",
-        }
-        
-        validation_results = {}
-        with self.driver.session() as session:
-            for metric_name, query in validation_queries.items():
-                result = session.run(query)
-                record = result.single()
-                validation_results[metric_name] = record['count'] if record else 0
-            
-            # Get sample genesets with statistics
-            sample_query = """
+        # All metrics in one round trip, each computed by its own subquery
+        query = """
+        CALL { MATCH (cg:CuratedGeneset) RETURN count(cg) as curated_genesets }
+        CALL { MATCH (gc:GenesetCollection) RETURN count(gc) as geneset_collections }
+        CALL { MATCH ()-[r:CURATED_MEMBER_OF]->() RETURN count(r) as curated_memberships }
+        CALL { MATCH ()-[r:PART_OF_COLLECTION]->() RETURN count(r) as collection_relationships }
+        CALL { MATCH ()-[r:ENRICHES_MODULE]->() RETURN count(r) as enrichment_relationships }
+        CALL {
             MATCH (cg:CuratedGeneset)
             OPTIONAL MATCH (cg)<-[:CURATED_MEMBER_OF]-(g:Gene)
-            RETURN cg.geneset_id as geneset_id, 
-                   cg.name as name,
-                   cg.source_collection as collection,
-                   count(g) as gene_count
+            WITH cg, count(g) as gene_count
             ORDER BY gene_count DESC
             LIMIT 10
-            """
-            
-            sample_result = session.run(sample_query)
-            validation_results['top_genesets'] = [dict(record) for record in sample_result]
-            
-            # Check for any orphaned nodes
-            orphan_query = """
+            RETURN collect({
+                geneset_id: cg.geneset_id,
+                name: cg.name,
+                collection: cg.source_collection,
+                gene_count: gene_count
+            }) as top_genesets
+        }
+        CALL {
             MATCH (cg:CuratedGeneset)
             WHERE NOT (cg)-[:PART_OF_COLLECTION]->()
             RETURN count(cg) as orphaned_genesets
-            """
-            
-            orphan_result = session.run(orphan_query)
-            orphan_record = orphan_result.single()
-            validation_results['orphaned_genesets'] = orphan_record['orphaned_genesets'] if orphan_record else 0
+        }
+        RETURN curated_genesets, geneset_collections, curated_memberships,
+               collection_relationships, enrichment_relationships,
+               top_genesets, orphaned_genesets
+        """
+        
+        with self.driver.session(database=NEO4J_CONFIG['database']) as session:
+            record = session.run(query).single()
+            validation_results = record.data() if record else {}
         
         logger.info(f"Integration validation complete: {validation_results}")
         return validation_results
@@ -532,22 +598,22 @@ def main():
         # Initialize with data directory path
         geneset_dir = f"{args.data_dir}/talisman-paper/genesets/human"
         parser = TalismanGenesetParser(geneset_dir)
-        engine = TalismanIntegrationEngine()
 
-        # Parse genesets
-        logger.info("Step 1: Parsing genesets...")
-        genesets = parser.parse_all_genesets()
-        logger.info(f"Parsed {len(genesets)} genesets")
+        with TalismanIntegrationEngine() as engine:
+            # Parse genesets
+            logger.info("Step 1: Parsing genesets...")
+            genesets = parser.parse_all_genesets()
+            logger.info(f"Parsed {len(genesets)} genesets")
 
-        # Run actual integration
-        logger.info("Step 2: Running geneset integration...")
-        results = engine.integrate_all_genesets(genesets, dry_run=False)
-        logger.info(f"Integration completed: {results}")
+            # Run actual integration
+            logger.info("Step 2: Running geneset integration...")
+            results = engine.integrate_all_genesets(genesets, dry_run=False)
+            logger.info(f"Integration completed: {results}")
 
-        # Validate
-        logger.info("Step 3: Validating integration...")
-        validation = engine.validate_integration()
-        logger.info(f"Validation results: {validation}")
+            # Validate
+            logger.info("Step 3: Validating integration...")
+            validation = engine.validate_integration()
+            logger.info(f"Validation results: {validation}")
 
         logger.info("Talisman geneset integration completed successfully!")
         print("Talisman geneset integration completed successfully!")
@@ -558,10 +624,6 @@ def main():
         print(f"Talisman integration failed: {e}")
         return False
 
-    finally:
-        if 'engine' in locals():
-            engine.close()
-
 if __name__ == "__main__":
     success = main()
     exit(0 if success else 1)
\ No newline at end of file
@@ -8,49 +8,200 @@ talisman geneset data into the existing Neo4j knowledge graph.
 """
 
 import logging
-from typing import Dict, List, Any
-from dataclasses import dataclass
-from neo4j import GraphDatabase
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, FrozenSet, Set, Tuple
+from dataclasses import dataclass, field
+from neo4j import GraphDatabase, READ_ACCESS, WRITE_ACCESS, RoutingControl
+
+from config.neo4j_config import NEO4J_CONFIG, NEO4J_CONNECTION_POOL
 
 logger = logging.getLogger(__name__)
 
+# Sessions used to retry schema items one by one after a failed batch
+SCHEMA_MAX_WORKERS = 4
+
+# Names, labels and properties interpolated into DDL must be plain identifiers
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Static schema listings; only the name column is shipped back
+_SHOW_CONSTRAINT_NAMES = "SHOW CONSTRAINTS YIELD name"
+_SHOW_INDEX_NAMES = "SHOW INDEXES YIELD name"
+
+
+def _check_identifiers(*identifiers: str) -> None:
+    """Raise ValueError unless every identifier is safe to interpolate into Cypher."""
+    for identifier in identifiers:
+        if not _IDENTIFIER.match(identifier):
+            raise ValueError(f"Invalid Cypher identifier: {identifier!r}")
+
+
+def _constraint_cypher(name: str, label: str, properties: Tuple[str, ...],
+                       constraint_type: str) -> str:
+    """Build the canonical single-line CREATE CONSTRAINT statement."""
+    _check_identifiers(name, label, *properties)
+    properties_str = ", ".join(f"n.{prop}" for prop in properties)
+    if constraint_type == "UNIQUE":
+        requirement = "IS UNIQUE"
+    elif constraint_type == "EXISTENCE":
+        requirement = "IS NOT NULL"
+    else:
+        raise ValueError(f"Unknown constraint type: {constraint_type}")
+    return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE ({properties_str}) {requirement}"
+
+
+def _index_cypher(name: str, labels: Tuple[str, ...], properties: Tuple[str, ...]) -> str:
+    """Build the canonical single-line CREATE INDEX statement."""
+    _check_identifiers(name, *labels, *properties)
+    labels_str = ":".join(labels)
+    properties_str = ", ".join(f"n.{prop}" for prop in properties)
+    return f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{labels_str}) ON ({properties_str})"
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class ConstraintDefinition:
     """Definition of a Neo4j constraint."""
     name: str
     label: str
-    properties: List[str]
+    properties: Tuple[str, ...]
     constraint_type: str  # 'UNIQUE', 'EXISTENCE'
+    cypher: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Build the DDL statement once, when the definition is created."""
+        object.__setattr__(self, 'cypher', _constraint_cypher(
+            self.name, self.label, self.properties, self.constraint_type
+        ))
 
 
-@dataclass  
+@dataclass(frozen=True, slots=True)
 class IndexDefinition:
     """Definition of a Neo4j index."""
     name: str
-    labels: List[str]
-    properties: List[str]
+    labels: Tuple[str, ...]
+    properties: Tuple[str, ...]
     index_type: str  # 'BTREE', 'RANGE'
+    cypher: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Build the DDL statement once, when the definition is created."""
+        object.__setattr__(self, 'cypher', _index_cypher(self.name, self.labels, self.properties))
+
+
+# Constraints required for talisman integration
+_TALISMAN_CONSTRAINTS: Tuple[ConstraintDefinition, ...] = (
+    # Primary unique constraints
+    ConstraintDefinition(
+        "curated_geneset_id_unique", 
+        "CuratedGeneset", 
+        ("geneset_id",), 
+        "UNIQUE"
+    ),
+    ConstraintDefinition(
+        "geneset_collection_id_unique", 
+        "GenesetCollection", 
+        ("collection_id",), 
+        "UNIQUE"
+    )
+)
+
+# Indexes required for talisman integration performance
+_TALISMAN_INDEXES: Tuple[IndexDefinition, ...] = (
+    # Gene symbol lookups used by every CURATED_MEMBER_OF MATCH
+    IndexDefinition(
+        "gene_symbol_idx", 
+        ("Gene",), 
+        ("symbol",), 
+        "RANGE"
+    ),
+
+    # Primary lookup indexes
+    IndexDefinition(
+        "curated_geneset_name_idx", 
+        ("CuratedGeneset",), 
+        ("name",), 
+        "BTREE"
+    ),
+    IndexDefinition(
+        "curated_geneset_gene_count_idx", 
+        ("CuratedGeneset",), 
+        ("gene_count",), 
+        "BTREE"
+    ),
+    IndexDefinition(
+        "geneset_collection_name_idx", 
+        ("GenesetCollection",), 
+        ("collection_name",), 
+        "BTREE"
+    ),
+
+    # Composite indexes for complex queries; the leading source_collection
+    # column also serves lookups on source_collection alone
+    IndexDefinition(
+        "curated_geneset_source_name_idx", 
+        ("CuratedGeneset",), 
+        ("source_collection", "name"), 
+        "BTREE"
+    )
+)
+
+# Indexes no longer created because another index covers them; existing
+# deployments can remove them with DROP INDEX <name> IF EXISTS
+_RETIRED_INDEXES: Tuple[str, ...] = (
+    "curated_geneset_source_idx",
+)
+
+# Indexes talisman relies on but does not own; go_kg_builder creates them
+# for the whole graph, so drop_schema leaves them in place
+_SHARED_INDEXES: FrozenSet[str] = frozenset({"gene_symbol_idx"})
+
+# Expected schema names, diffed against the live schema with set operations
+_EXPECTED_CONSTRAINT_NAMES: FrozenSet[str] = frozenset(c.name for c in _TALISMAN_CONSTRAINTS)
+_EXPECTED_INDEX_NAMES: FrozenSet[str] = frozenset(i.name for i in _TALISMAN_INDEXES)
 
 
 class TalismanSchemaSetup:
-    """Setup schema extensions for talisman geneset integration."""
+    """
+    Setup schema extensions for talisman geneset integration.
+    
+    Uses the caller's driver and holds at most SCHEMA_MAX_WORKERS + 1
+    connections at once. Callers sharing the driver with other workloads
+    should size max_connection_pool_size to cover both.
+    """
     
-    def __init__(self, neo4j_driver):
-        """Initialize schema setup with Neo4j driver."""
+    def __init__(self, neo4j_driver, database: str = "neo4j"):
+        """
+        Initialize schema setup with Neo4j driver.
+        
+        Args:
+            neo4j_driver: Active Neo4j GraphDatabase driver instance
+            database: Neo4j database to create the schema in
+        """
         self.driver = neo4j_driver
+        self.database = database
+        # Set once create_schema completes without errors
+        self._schema_verified = False
         
-    def create_schema(self) -> Dict[str, Any]:
+    def create_schema(self, force: bool = False) -> Dict[str, Any]:
         """
         Create constraints and indexes for talisman integration.
         
         Creates:
         - CuratedGeneset unique constraint on geneset_id
         - GenesetCollection unique constraint on collection_id
+        - Gene symbol index used to match geneset members
         - Performance indexes for common query patterns
         
+        Only items missing from SHOW CONSTRAINTS / SHOW INDEXES are created.
+        Once a run succeeds, later calls on this instance return without
+        querying Neo4j unless force is set.
+        
+        Args:
+            force: Check and create the schema even if already verified
+        
         Returns:
-            Dictionary with creation results and any errors
+            Dictionary with creation results; each entry in "errors" is a dict
+            with the item name, exception type and message
         """
         results = {
             "constraints_created": 0,
@@ -58,126 +209,120 @@ class TalismanSchemaSetup:
             "errors": []
         }
         
+        if self._schema_verified and not force:
+            results["cached"] = True
+            return results
+        
         logger.info("Creating talisman integration schema extensions...")
         
-        # Create constraints
-        constraints = self._get_talisman_constraints()
-        for constraint in constraints:
+        # One session for all DDL statements
+        with self.driver.session(database=self.database, default_access_mode=WRITE_ACCESS) as session:
             try:
-                self._create_constraint(constraint)
-                results["constraints_created"] += 1
-                logger.info(f"Created constraint: {constraint.name}")
+                existing_constraints, existing_indexes = session.execute_read(self._existing_schema_names)
             except Exception as e:
-                error_msg = f"Failed to create constraint {constraint.name}: {e}"
-                logger.error(error_msg)
-                results["errors"].append(error_msg)
-        
-        # Create indexes
-        indexes = self._get_talisman_indexes()
-        for index in indexes:
+                # Fall back to CREATE ... IF NOT EXISTS for everything
+                logger.warning("Could not list existing schema, creating all items: %s", e)
+                existing_constraints = existing_indexes = set()
+            
+            constraints = [c for c in self._get_talisman_constraints() if c.name not in existing_constraints]
+            indexes = [i for i in self._get_talisman_indexes() if i.name not in existing_indexes]
+            if not constraints and not indexes:
+                self._schema_verified = True
+                logger.info("Talisman schema already in place")
+                return results
+            
             try:
-                self._create_index(index)
-                results["indexes_created"] += 1
-                logger.info(f"Created index: {index.name}")
+                # All missing DDL in one transaction: one commit, one schema lock
+                session.execute_write(self._create_schema_items, constraints, indexes)
+                results["constraints_created"] = len(constraints)
+                results["indexes_created"] = len(indexes)
+                logger.info("Created constraints: %s", [c.name for c in constraints])
+                logger.info("Created indexes: %s", [i.name for i in indexes])
             except Exception as e:
-                error_msg = f"Failed to create index {index.name}: {e}"
-                logger.error(error_msg)
-                results["errors"].append(error_msg)
+                # Retry item by item so one bad definition doesn't block the rest
+                logger.warning("Batched schema creation failed, retrying per item: %s", e)
+                items = [("constraint", c) for c in constraints] + [("index", i) for i in indexes]
+                
+                # Each item on its own session so the Bolt round trips overlap
+                with ThreadPoolExecutor(max_workers=min(SCHEMA_MAX_WORKERS, len(items))) as executor:
+                    futures = {
+                        executor.submit(self._apply_one, definition): (kind, definition)
+                        for kind, definition in items
+                    }
+                    for future in as_completed(futures):
+                        kind, definition = futures[future]
+                        try:
+                            future.result()
+                            results["constraints_created" if kind == "constraint" else "indexes_created"] += 1
+                            logger.info("Created %s: %s", kind, definition.name)
+                        except Exception as e:
+                            logger.exception("Failed to create %s %s", kind, definition.name)
+                            results["errors"].append({
+                                "name": definition.name,
+                                "type": type(e).__name__,
+                                "message": f"Failed to create {kind} {definition.name}: {e}"
+                            })
         
-        logger.info(f"Talisman schema creation completed: {results}")
+        if not results["errors"]:
+            self._schema_verified = True
+        
+        logger.info("Talisman schema creation completed: %s", results)
         return results
     
-    def _get_talisman_constraints(self) -> List[ConstraintDefinition]:
+    def _get_talisman_constraints(self) -> Tuple[ConstraintDefinition, ...]:
         """Get constraints required for talisman integration."""
-        return [
-            # Primary unique constraints
-            ConstraintDefinition(
-                "curated_geneset_id_unique", 
-                "CuratedGeneset", 
-                ["geneset_id"], 
-                "UNIQUE"
-            ),
-            ConstraintDefinition(
-                "geneset_collection_id_unique", 
-                "GenesetCollection", 
-                ["collection_id"], 
-                "UNIQUE"
-            )
-        ]
+        return _TALISMAN_CONSTRAINTS
     
-    def _get_talisman_indexes(self) -> List[IndexDefinition]:
+    def _get_talisman_indexes(self) -> Tuple[IndexDefinition, ...]:
         """Get indexes required for talisman integration performance."""
-        return [
-            # Primary lookup indexes
-            IndexDefinition(
-                "curated_geneset_name_idx", 
-                ["CuratedGeneset"], 
-                ["name"], 
-                "BTREE"
-            ),
-            IndexDefinition(
-                "curated_geneset_source_idx", 
-                ["CuratedGeneset"], 
-                ["source_collection"], 
-                "BTREE"
-            ),
-            IndexDefinition(
-                "curated_geneset_gene_count_idx", 
-                ["CuratedGeneset"], 
-                ["gene_count"], 
-                "BTREE"
-            ),
-            IndexDefinition(
-                "geneset_collection_name_idx", 
-                ["GenesetCollection"], 
-                ["collection_name"], 
-                "BTREE"
-            ),
-            
-            # Composite indexes for complex queries
-            IndexDefinition(
-                "curated_geneset_source_name_idx", 
-                ["CuratedGeneset"], 
-                ["source_collection", "name"], 
-                "BTREE"
-            )
-        ]
+        return _TALISMAN_INDEXES
     
-    def _create_constraint(self, constraint: ConstraintDefinition) -> None:
-        """Create a single constraint."""
-        if constraint.constraint_type == "UNIQUE":
-            properties_str = ", ".join([f"n.{prop}" for prop in constraint.properties])
-            query = f"""
-            CREATE CONSTRAINT {constraint.name} IF NOT EXISTS
-            FOR (n:{constraint.label})
-            REQUIRE ({properties_str}) IS UNIQUE
-            """
-        elif constraint.constraint_type == "EXISTENCE":
-            properties_str = ", ".join([f"n.{prop}" for prop in constraint.properties])
-            query = f"""
-            CREATE CONSTRAINT {constraint.name} IF NOT EXISTS
-            FOR (n:{constraint.label})
-            REQUIRE ({properties_str}) IS NOT NULL
-            """
-        else:
-            raise ValueError(f"Unknown constraint type: {constraint.constraint_type}")
+    def _existing_schema_names(self, tx) -> Tuple[Set[str], Set[str]]:
+        """
+        Get the names of all existing constraints and indexes.
         
-        with self.driver.session() as session:
-            session.run(query)
-    
-    def _create_index(self, index: IndexDefinition) -> None:
-        """Create a single index.""" 
-        labels_str = ":".join(index.labels)
-        properties_str = ", ".join([f"n.{prop}" for prop in index.properties])
+        Neo4j does not accept SHOW commands inside CALL subqueries or UNION,
+        so both listings are fetched back to back in the same transaction.
         
-        query = f"""
-        CREATE INDEX {index.name} IF NOT EXISTS
-        FOR (n:{labels_str})
-        ON ({properties_str})
+        Args:
+            tx: Managed Neo4j transaction
+            
+        Returns:
+            Tuple of (constraint names, index names)
         """
-        
-        with self.driver.session() as session:
-            session.run(query)
+        return self._existing_constraint_names(tx), self._existing_index_names(tx)
+    
+    def _existing_constraint_names(self, session) -> Set[str]:
+        """Get the names of all constraints in the database."""
+        return {record['name'] for record in session.run(_SHOW_CONSTRAINT_NAMES)}
+    
+    def _existing_index_names(self, session) -> Set[str]:
+        """Get the names of all indexes in the database."""
+        return {record['name'] for record in session.run(_SHOW_INDEX_NAMES)}
+    
+    def _create_schema_items(self, tx, constraints: List[ConstraintDefinition],
+                             indexes: List[IndexDefinition]) -> None:
+        """Create constraints and indexes in one managed transaction."""
+        for constraint in constraints:
+            self._create_constraint(tx, constraint)
+        for index in indexes:
+            self._create_index(tx, index)
+    
+    def _apply_one(self, definition) -> None:
+        """Create one constraint or index in its own driver-managed transaction."""
+        self.driver.execute_query(
+            definition.cypher,
+            database_=self.database,
+            routing_=RoutingControl.WRITE
+        )
+    
+    def _create_constraint(self, session, constraint: ConstraintDefinition) -> None:
+        """Create a single constraint in an open session or transaction."""
+        session.run(constraint.cypher).consume()
+    
+    def _create_index(self, session, index: IndexDefinition) -> None:
+        """Create a single index in an open session or transaction.""" 
+        session.run(index.cypher).consume()
     
     def validate_schema(self) -> Dict[str, Any]:
         """
@@ -195,30 +340,21 @@ class TalismanSchemaSetup:
         }
         
         try:
-            with self.driver.session() as session:
-                # Check constraints
-                constraints_query = "SHOW CONSTRAINTS"
-                constraints_result = session.run(constraints_query)
-                found_constraints = [c.get('name', '') for c in constraints_result]
+            with self.driver.session(database=self.database, default_access_mode=READ_ACCESS) as session:
+                # Managed read transaction: routable to a follower and retried on transient errors
+                found_constraints, found_indexes = session.execute_read(self._existing_schema_names)
                 
-                expected_constraints = [c.name for c in self._get_talisman_constraints()]
-                for constraint_name in expected_constraints:
-                    if constraint_name in found_constraints:
-                        validation["constraints_found"].append(constraint_name)
-                    else:
-                        validation["missing_constraints"].append(constraint_name)
+                # Diff expected names against the existing ones
+                validation["constraints_found"] = sorted(_EXPECTED_CONSTRAINT_NAMES & found_constraints)
+                validation["missing_constraints"] = sorted(_EXPECTED_CONSTRAINT_NAMES - found_constraints)
+                validation["indexes_found"] = sorted(_EXPECTED_INDEX_NAMES & found_indexes)
+                validation["missing_indexes"] = sorted(_EXPECTED_INDEX_NAMES - found_indexes)
                 
-                # Check indexes
-                indexes_query = "SHOW INDEXES"
-                indexes_result = session.run(indexes_query)
-                found_indexes = [i.get('name', '') for i in indexes_result]
-                
-                expected_indexes = [i.name for i in self._get_talisman_indexes()]
-                for index_name in expected_indexes:
-                    if index_name in found_indexes:
-                        validation["indexes_found"].append(index_name)
-                    else:
-                        validation["missing_indexes"].append(index_name)
+                # Migration note for indexes superseded by a composite index
+                retired_indexes = [name for name in _RETIRED_INDEXES if name in found_indexes]
+                if retired_indexes:
+                    validation["retired_indexes"] = retired_indexes
+                    logger.info("Redundant indexes can be dropped with DROP INDEX <name> IF EXISTS: %s", retired_indexes)
                 
                 # Overall status
                 all_constraints_found = len(validation["missing_constraints"]) == 0
@@ -230,22 +366,80 @@ class TalismanSchemaSetup:
             validation["overall_status"] = "ERROR"
         
         return validation
+    
+    def drop_schema(self) -> Dict[str, Any]:
+        """
+        Drop the talisman-owned constraints and indexes, including retired indexes.
+        
+        Shared indexes such as gene_symbol_idx are left in place because
+        other phases depend on them. Only items listed by SHOW CONSTRAINTS /
+        SHOW INDEXES are dropped, and every statement uses IF EXISTS, so the
+        teardown is idempotent.
+        
+        Returns:
+            Dictionary with the names actually dropped and any errors
+        """
+        owned_constraints = [c.name for c in self._get_talisman_constraints()]
+        owned_indexes = [i.name for i in self._get_talisman_indexes()
+                         if i.name not in _SHARED_INDEXES] + list(_RETIRED_INDEXES)
+        # Retired names never pass through the DDL builders, so check them here too
+        _check_identifiers(*owned_constraints, *owned_indexes)
+        
+        results = {
+            "constraints_dropped": [],
+            "indexes_dropped": [],
+            "errors": []
+        }
+        
+        logger.info("Dropping talisman integration schema extensions...")
+        try:
+            with self.driver.session(database=self.database, default_access_mode=WRITE_ACCESS) as session:
+                existing_constraints, existing_indexes = session.execute_read(self._existing_schema_names)
+                constraint_names = [name for name in owned_constraints if name in existing_constraints]
+                index_names = [name for name in owned_indexes if name in existing_indexes]
+                queries = ([f"DROP CONSTRAINT {name} IF EXISTS" for name in constraint_names] +
+                           [f"DROP INDEX {name} IF EXISTS" for name in index_names])
+                
+                if queries:
+                    # One managed transaction for every DROP statement
+                    session.execute_write(self._run_schema_queries, queries)
+            results["constraints_dropped"] = constraint_names
+            results["indexes_dropped"] = index_names
+            self._schema_verified = False
+            logger.info("Dropped constraints: %s", constraint_names)
+            logger.info("Dropped indexes: %s", index_names)
+        except Exception as e:
+            logger.exception("Failed to drop talisman schema")
+            results["errors"].append({
+                "name": None,
+                "type": type(e).__name__,
+                "message": f"Failed to drop talisman schema: {e}"
+            })
+        
+        return results
+    
+    @staticmethod
+    def _run_schema_queries(tx, queries: List[str]) -> None:
+        """Run each schema statement in the given transaction."""
+        for query in queries:
+            tx.run(query).consume()
 
 
 if __name__ == "__main__":
     # Example usage
-    from neo4j import GraphDatabase
-    from config.neo4j_config import NEO4J_CONFIG
-    
     # Initialize connection
     driver = GraphDatabase.driver(
         NEO4J_CONFIG['uri'], 
-        auth=(NEO4J_CONFIG['username'], NEO4J_CONFIG['password'])
+        auth=(NEO4J_CONFIG['username'], NEO4J_CONFIG['password']),
+        max_connection_pool_size=NEO4J_CONNECTION_POOL['max_connection_pool_size'],
+        connection_acquisition_timeout=NEO4J_CONNECTION_POOL['connection_acquisition_timeout'],
+        connection_timeout=NEO4J_CONNECTION_POOL['connection_timeout'],
+        keep_alive=True
     )
     
     try:
         # Create schema
-        schema_setup = TalismanSchemaSetup(driver)
+        schema_setup = TalismanSchemaSetup(driver, database=NEO4J_CONFIG['database'])
         results = schema_setup.create_schema()
         print(f"Schema creation results: {results}")
         
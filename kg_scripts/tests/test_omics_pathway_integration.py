@@ -0,0 +1,52 @@
+"""Tests for NeST pathway table parsing."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from omics_pathway_integration import PathwayIntegrationProcessor
+
+
+NEST_TABLE = (
+    "NEST ID,name,name_new,All_Genes,Size_All,name_show,sum,selected,Cisplatin\n"
+    "NEST:1,Pathway one,Description one,\"TP53,BRCA1\",12.7,3.5,4.9,1,0.25\n"
+    "NEST:2,Pathway two,,\"EGFR\",,,,0,\n"
+)
+
+
+class PathwayTableParsingTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, 'NeST_table_All.csv'), 'w') as f:
+            f.write(NEST_TABLE)
+        self.processor = PathwayIntegrationProcessor(self.tmp.name)
+    
+    def tearDown(self):
+        self.processor.close()
+        self.tmp.cleanup()
+    
+    def test_fractional_integer_cells_are_truncated(self):
+        pathways = {pathway['nest_id']: pathway for pathway in self.processor.parse_pathway_data()}
+        
+        first = pathways['NEST:1']
+        self.assertEqual(first['size_all'], 12)
+        self.assertEqual(first['display_priority'], 3)
+        self.assertEqual(first['aggregate_score'], 4)
+        self.assertEqual(first['cisplatin_sensitivity'], 0.25)
+        
+        second = pathways['NEST:2']
+        self.assertEqual(second['size_all'], 1)
+        self.assertNotIn('display_priority', second)
+        
+        records = {record['nest_id']: record for record in
+                   self.processor._pathway_module_records(list(pathways.values()))}
+        self.assertEqual(records['NEST:1']['display_priority'], 3)
+        self.assertIsNone(records['NEST:2']['display_priority'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Tests for the viral integration parsing and expression gather."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from omics_viral_integration import ViralIntegrationProcessor
+
+
+EDGES = (
+    "GeneSym\tsource_desc\tGeneID\tviral_condition_full\tviral_condition\tstudy_id\tweight\n"
+    "#\t#\t#\t#\t#\t#\t#\n"
+    "GENE1\tna\t1\tHCMV_24h\tHCMV\tGSE1\t0.3\n"
+    "GENE2\tna\t2\tHCMV_24h\tHCMV\tGSE1\t-1.0\n"
+)
+
+MATRIX = (
+    "#\t#\tGeneID\tHCMV_24h\n"
+    "#\t#\t#\tHCMV\n"
+    "GENE1\tna\t1\t123.456789\n"
+    "GENE2\tna\t2\t-0.000000123\n"
+)
+
+
+class ViralExpressionWeightTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, 'Viral_Infections__gene_attribute_edges.txt'), 'w') as f:
+            f.write(EDGES)
+        with open(os.path.join(self.tmp.name, 'Viral_Infections_gene_attribute_matrix_standardized.txt'), 'w') as f:
+            f.write(MATRIX)
+        self.processor = ViralIntegrationProcessor(self.tmp.name)
+    
+    def tearDown(self):
+        self.processor.close()
+        self.tmp.cleanup()
+    
+    def _edge_payload(self):
+        edges_df = self.processor.parse_viral_edges()
+        matrix_df = self.processor.parse_viral_matrix()
+        integrated_df = self.processor.integrate_viral_data(edges_df, matrix_df)
+        return [edge for batch in self.processor._edge_batches(integrated_df, 100) for edge in batch]
+    
+    def test_expression_weights_round_trip_exactly(self):
+        weights = {edge['gene_symbol']: edge['expression_weight'] for edge in self._edge_payload()}
+        self.assertEqual(weights['GENE1'], 123.456789)
+        self.assertEqual(weights['GENE2'], -0.000000123)
+    
+    def test_edge_weights_round_trip_exactly(self):
+        weights = {edge['gene_symbol']: edge['edge_weight'] for edge in self._edge_payload()}
+        self.assertEqual(weights['GENE1'], 0.3)
+        self.assertEqual(weights['GENE2'], -1.0)
+
+    
+    def test_crlf_matrix_header(self):
+        with open(os.path.join(self.tmp.name, 'Viral_Infections_gene_attribute_matrix_standardized.txt'),
+                  'w', newline='') as f:
+            f.write(MATRIX.replace('\n', '\r\n'))
+        matrix_df = self.processor.parse_viral_matrix()
+        self.assertEqual(list(matrix_df.columns), ['HCMV_24h'])
+        self.assertEqual(matrix_df.loc['GENE1', 'HCMV_24h'], 123.456789)
+
+
+if __name__ == '__main__':
+    unittest.main()